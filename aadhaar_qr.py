@@ -0,0 +1,103 @@
+"""
+Aadhaar QR code decoding.
+Supports the legacy XML QR (PrintLetterBarcodeData) and the UIDAI Secure QR
+(a big decimal integer wrapping a gzip stream of 0xFF-delimited fields).
+Decoded payloads are returned in the same structure as extract_aadhaar_details.
+"""
+import gzip
+import re
+import zlib
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+try:
+    import cv2
+except ImportError:  # opencv ships with easyocr; without it the fast path is simply skipped
+    cv2 = None
+
+# Secure QR field positions (V1 layout; V2+ prefix an extra version field)
+_SECURE_FIELDS = {"reference_id": 1, "name": 2, "dob": 3, "gender": 4}
+_GENDERS = {"M": "male", "F": "female", "T": "transgender"}
+
+
+def decode_qr(pil_img):
+    """Locate and decode a QR code in the image. Returns the payload string or None"""
+    if cv2 is None:
+        return None
+    grey = np.array(pil_img.convert('L'))
+    detector = cv2.QRCodeDetector()
+    try:
+        data, points, _ = detector.detectAndDecode(grey)
+    except cv2.error:
+        return None
+    return data or None
+
+
+def _details(aadhaar_number=None, name=None, dob=None, gender=None, **extra):
+    details = {
+        "aadhaar_number": aadhaar_number,
+        "name": name,
+        "dob": dob,
+        "gender": _GENDERS.get((gender or "").upper()[:1]) if gender else None,
+        "vid": None,
+        "source": "qr",
+    }
+    details.update(extra)
+    return details
+
+
+def _parse_xml(data):
+    start = data.find('<PrintLetterBarcodeData')
+    root = ET.fromstring(data[start:] if start >= 0 else data)
+    uid = re.sub(r'\D', '', root.get('uid', ''))
+    return _details(
+        aadhaar_number=uid if len(uid) == 12 else None,
+        name=root.get('name'),
+        dob=root.get('dob') or root.get('yob'),
+        gender=root.get('gender'),
+        qr_type="xml"
+    )
+
+
+def _parse_secure(data):
+    number = int(data)
+    payload = gzip.decompress(number.to_bytes((number.bit_length() + 7) // 8, 'big'))
+
+    fields = [f.decode('iso-8859-1') for f in payload.split(b'\xff')]
+    offset = 1 if fields and re.match(r'^V\d+$', fields[0]) else 0
+
+    def field(name):
+        index = _SECURE_FIELDS[name] + offset
+        return fields[index] if index < len(fields) else None
+
+    reference_id = field("reference_id") or ""
+    last4 = reference_id[:4] if reference_id[:4].isdigit() else None
+    # Secure QR carries only the last 4 digits of the Aadhaar number
+    return _details(
+        name=field("name"),
+        dob=field("dob"),
+        gender=field("gender"),
+        aadhaar_last4=last4,
+        qr_type="secure"
+    )
+
+
+def parse_qr_payload(data):
+    """Parse a decoded QR payload. Returns Aadhaar details or None if unrecognized"""
+    if not data:
+        return None
+    data = data.strip()
+    try:
+        if 'PrintLetterBarcodeData' in data:
+            return _parse_xml(data)
+        if data.isdigit() and len(data) > 100:
+            return _parse_secure(data)
+    except (ET.ParseError, OSError, zlib.error, ValueError, EOFError):
+        return None
+    return None
+
+
+def read_aadhaar_qr(pil_img):
+    """Decode and parse the Aadhaar QR code in an image, or None"""
+    return parse_qr_payload(decode_qr(pil_img))
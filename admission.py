@@ -0,0 +1,185 @@
+"""
+Admission control for the OCR upload path:
+- per-client token-bucket rate limiting
+- a concurrency limit tied to OCR capacity, with a bounded wait queue
+- per-request deadlines so queued work is dropped once the budget is spent
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Configuration (environment overrides)
+OCR_MAX_CONCURRENCY = int(os.getenv('OCR_MAX_CONCURRENCY', '2'))
+OCR_MAX_QUEUE = int(os.getenv('OCR_MAX_QUEUE', '8'))
+REQUEST_DEADLINE_SECONDS = float(os.getenv('REQUEST_DEADLINE_SECONDS', '60'))
+RATE_LIMIT_PER_MINUTE = float(os.getenv('RATE_LIMIT_PER_MINUTE', '10'))
+RATE_LIMIT_BURST = int(os.getenv('RATE_LIMIT_BURST', '5'))
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv('RATE_LIMIT_MAX_CLIENTS', '10000'))
+# Only these X-API-Key values identify a client (comma-separated); others are ignored
+RATE_LIMIT_API_KEYS = frozenset(
+    key.strip() for key in os.getenv('RATE_LIMIT_API_KEYS', '').split(',') if key.strip()
+)
+# Reverse proxies in front of the app that append to X-Forwarded-For (0 = ignore the header)
+TRUSTED_PROXY_HOPS = int(os.getenv('TRUSTED_PROXY_HOPS', '0'))
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; carries the HTTP status and Retry-After"""
+
+    def __init__(self, status_code, detail, retry_after):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+class DeadlineExceeded(AdmissionRejected):
+    """Raised when a request runs out of its time budget"""
+
+    def __init__(self, stage, retry_after=5):
+        super().__init__(
+            503,
+            f"Request deadline exceeded while {stage}. Please try again shortly.",
+            retry_after
+        )
+        self.stage = stage
+
+
+class Deadline:
+    """Time budget for a single request"""
+
+    def __init__(self, budget_seconds=REQUEST_DEADLINE_SECONDS):
+        self.budget = budget_seconds
+        self.expires_at = time.monotonic() + budget_seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def check(self, stage):
+        """Raise DeadlineExceeded if the budget is spent before `stage` starts"""
+        if self.expired():
+            raise DeadlineExceeded(stage)
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available. Returns (allowed, seconds until allowed)"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True, 0.0
+        if self.rate <= 0:
+            return False, 60.0
+        return False, (tokens - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Per-client token buckets, bounded in memory by LRU eviction"""
+
+    def __init__(self, per_minute=RATE_LIMIT_PER_MINUTE, burst=RATE_LIMIT_BURST,
+                 max_clients=RATE_LIMIT_MAX_CLIENTS):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, client_key):
+        with self._lock:
+            bucket = self._buckets.get(client_key)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self._buckets[client_key] = bucket
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client_key)
+            return bucket.try_acquire()
+
+
+class ConcurrencyLimiter:
+    """
+    Caps the number of requests running OCR at once.
+    Waiters beyond `max_queue` are rejected immediately; queued waiters give up
+    when their deadline expires, before any OCR CPU is spent on them.
+    """
+
+    def __init__(self, limit=OCR_MAX_CONCURRENCY, max_queue=OCR_MAX_QUEUE):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.waiting = 0
+        self.avg_service_time = None
+        self._semaphore = None
+
+    def _get_semaphore(self):
+        # Created lazily so it binds to the server's running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    def retry_after(self):
+        """Rough estimate of when a slot frees up, from the average service time"""
+        service_time = self.avg_service_time or 5.0
+        return service_time * (self.waiting + 1) / max(1, self.limit)
+
+    async def acquire(self, deadline):
+        """Wait for a slot until the deadline. Raises AdmissionRejected on shed"""
+        if self.waiting >= self.max_queue:
+            raise AdmissionRejected(
+                503, "Server is busy processing other documents. Please try again shortly.",
+                self.retry_after()
+            )
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._get_semaphore().acquire(), timeout=deadline.remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("waiting for OCR capacity", self.retry_after())
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        return time.monotonic()
+
+    def release(self, started_at):
+        elapsed = time.monotonic() - started_at
+        if self.avg_service_time is None:
+            self.avg_service_time = elapsed
+        else:
+            self.avg_service_time = 0.8 * self.avg_service_time + 0.2 * elapsed
+        self.in_flight -= 1
+        self._get_semaphore().release()
+
+
+def client_identity(request):
+    """
+    Identify the caller: a configured API key if one is presented, else the
+    originating IP. Both headers are client-controlled, so unknown API keys are
+    ignored and X-Forwarded-For is read only behind TRUSTED_PROXY_HOPS proxies,
+    taking the address the outermost trusted proxy saw (right-most untrusted entry).
+    """
+    api_key = request.headers.get('x-api-key')
+    if api_key and api_key in RATE_LIMIT_API_KEYS:
+        return f"key:{api_key}"
+    if TRUSTED_PROXY_HOPS > 0:
+        forwarded = [hop.strip() for hop in request.headers.get('x-forwarded-for', '').split(',') if hop.strip()]
+        if forwarded:
+            return f"ip:{forwarded[-min(TRUSTED_PROXY_HOPS, len(forwarded))]}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
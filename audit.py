@@ -0,0 +1,170 @@
+"""
+Write-behind audit trail of KYC verification attempts.
+Outcomes are appended to an in-process buffer and flushed by a background
+thread in Firestore WriteBatch chunks, or to a local append-only JSONL file
+when Firestore is unavailable. Memory is bounded: when the buffer is full,
+records spill straight to the local file instead of being dropped.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import metrics
+import firebase_utils
+
+AUDIT_COLLECTION = os.getenv('AUDIT_COLLECTION', 'kyc_audit_log')
+AUDIT_LOG_PATH = os.getenv('AUDIT_LOG_PATH', 'audit_log.jsonl')
+AUDIT_BUFFER_MAX = int(os.getenv('AUDIT_BUFFER_MAX', '5000'))
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', '2'))
+# Firestore allows at most 500 writes per batch
+AUDIT_BATCH_SIZE = min(500, int(os.getenv('AUDIT_BATCH_SIZE', '400')))
+
+
+def mask_aadhaar(aadhaar_number):
+    """Keep only the last 4 digits of an Aadhaar number"""
+    last4 = firebase_utils.get_last4_aadhaar(aadhaar_number)
+    return f"XXXX XXXX {last4}" if last4 else None
+
+
+def mask_pan(pan_number):
+    """Keep the first 2 and last 2 characters of a PAN"""
+    if not pan_number or len(pan_number) < 4:
+        return None
+    return pan_number[:2] + "X" * (len(pan_number) - 4) + pan_number[-2:]
+
+
+def build_audit_record(session_id, session):
+    """Build a masked audit record from a finished processing session"""
+    pan = session.get("pan") or {}
+    aadhaar = session.get("aadhaar") or {}
+    verification = session.get("verification") or {}
+    aadhaar_number = aadhaar.get("aadhaar_number")
+
+    return {
+        "session_id": session_id,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "status": session.get("status"),
+        "verified": bool(verification.get("verified", False)),
+        # Codes only: the free-text messages can carry names from the documents
+        "error": verification.get("error_code") or session.get("error_code"),
+        "test_mode": bool(verification.get("test_mode", False)),
+        "pan_masked": mask_pan(pan.get("pan_number")),
+        "aadhaar_masked": mask_aadhaar(aadhaar_number),
+        "aadhaar_hash": firebase_utils.hash_aadhaar(aadhaar_number),
+        "match_details": {
+            key: value for key, value in (verification.get("match_details") or {}).items()
+            if key not in ("pan_name", "firebase_name")
+        },
+        "stage_seconds": dict(session.get("timings") or {}),
+        "duplicates": dict(session.get("duplicates") or {}),
+    }
+
+
+class AuditTrail:
+    """Buffered audit writer with asynchronous, batched flushing"""
+
+    def __init__(self, collection=AUDIT_COLLECTION, log_path=AUDIT_LOG_PATH,
+                 max_buffer=AUDIT_BUFFER_MAX, flush_interval=AUDIT_FLUSH_INTERVAL,
+                 batch_size=AUDIT_BATCH_SIZE):
+        self.collection = collection
+        self.log_path = log_path
+        self.max_buffer = max_buffer
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._buffer = deque()
+        self._cond = threading.Condition()
+        self._file_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+
+    def record(self, entry):
+        """
+        Queue an audit record; never blocks on the network, but writes and
+        fsyncs the local log when the buffer is full, so call it from a thread
+        """
+        with self._cond:
+            if len(self._buffer) < self.max_buffer:
+                self._buffer.append(entry)
+                metrics.set_gauge("audit.buffered", len(self._buffer))
+                if len(self._buffer) >= self.batch_size:
+                    self._cond.notify()
+                return
+        # Buffer full: spill to the local log rather than grow or drop
+        metrics.inc("audit.spilled")
+        self._write_file([entry])
+
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="audit-flusher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        """Stop the flusher and write out everything still buffered"""
+        if self._thread is not None:
+            with self._cond:
+                self._stopping = True
+                self._cond.notify()
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._buffer) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if self._stopping:
+                    return
+            self.flush()
+
+    def _take_chunk(self):
+        with self._cond:
+            chunk = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            metrics.set_gauge("audit.buffered", len(self._buffer))
+            return chunk
+
+    def flush(self):
+        """Drain the buffer in batch-sized chunks"""
+        while True:
+            chunk = self._take_chunk()
+            if not chunk:
+                return
+            started = time.perf_counter()
+            if not self._write_firestore(chunk):
+                self._write_file(chunk)
+            metrics.observe("audit.flush_seconds", time.perf_counter() - started)
+
+    def _write_firestore(self, chunk):
+        db = firebase_utils.db
+        if not db:
+            return False
+        try:
+            batch = db.batch()
+            collection = db.collection(self.collection)
+            for entry in chunk:
+                batch.set(collection.document(entry["session_id"]), entry)
+            batch.commit()
+            metrics.inc("audit.firestore_written", len(chunk))
+            return True
+        except Exception as e:
+            print(f"⚠️  Audit batch write to Firestore failed, using local log: {e}", flush=True)
+            metrics.inc("audit.firestore_errors")
+            return False
+
+    def _write_file(self, chunk):
+        try:
+            with self._file_lock, open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write("".join(json.dumps(entry, default=str) + "\n" for entry in chunk))
+                f.flush()
+                os.fsync(f.fileno())
+            metrics.inc("audit.file_written", len(chunk))
+        except OSError as e:
+            print(f"❌ Could not write audit log {self.log_path}: {e}", flush=True)
+            metrics.inc("audit.lost", len(chunk))
+
+
+audit_trail = AuditTrail()
@@ -0,0 +1,91 @@
+"""
+Offline load test of the verification path against the in-memory record store.
+
+Examples:
+    python bench_verification.py --requests 2000 --concurrency 16 --latency lognormal:0.03,0.6
+    python bench_verification.py --records seed.jsonl --error-rate 0.02 --timeout 0.2
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import firebase_utils
+from record_store import InMemoryRecordStore
+from seed_records import generate_records
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test process_verification offline")
+    parser.add_argument("--records", help="JSON-lines file of Aadhaar records")
+    parser.add_argument("--synthetic", type=int, default=10000, help="Records to generate when --records is not given")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--hit-rate", type=float, default=0.9, help="Fraction of lookups for existing records")
+    parser.add_argument("--latency", default="lognormal:0.02,0.5", help="Latency distribution spec")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--raw", action="store_true", help="Skip hedging, deadlines and the circuit breaker")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    options = dict(latency=args.latency, error_rate=args.error_rate, timeout=args.timeout, seed=args.seed)
+    if args.records:
+        store = InMemoryRecordStore.from_jsonl(args.records, **options)
+    else:
+        store = InMemoryRecordStore(generate_records(args.synthetic, args.seed), **options)
+    firebase_utils.set_record_store(store, resilient=not args.raw)
+
+    records = store.records
+    workload = []
+    for _ in range(args.requests):
+        if records and rng.random() < args.hit_rate:
+            record = rng.choice(records)
+            aadhaar = str(record.get("aadhaar_hash") or record.get("aadhaar_number"))
+            name = record.get("name")
+        else:
+            aadhaar, name = str(rng.randrange(10**11, 10**12)), "UNKNOWN PERSON"
+        workload.append({"pan": {"name": name}, "aadhaar": {"aadhaar_number": aadhaar}})
+
+    def run(ocr_data):
+        started = time.perf_counter()
+        result = firebase_utils.process_verification(ocr_data)
+        return time.perf_counter() - started, result
+
+    print("=" * 60)
+    print(f"VERIFICATION LOAD TEST: {len(store)} records, {args.requests} requests, "
+          f"concurrency {args.concurrency}")
+    print("=" * 60)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        outcomes = list(pool.map(run, workload))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in outcomes)
+    verdicts = {}
+    for _, result in outcomes:
+        key = "verified" if result.get("verified") else (result.get("error_code") or "rejected")
+        verdicts[key] = verdicts.get(key, 0) + 1
+
+    print(f"Throughput: {len(outcomes) / elapsed:.1f} req/s")
+    for label, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+        print(f"{label}: {percentile(latencies, fraction) * 1000:.1f} ms")
+    print(f"max: {latencies[-1] * 1000:.1f} ms")
+    print("\nOutcomes:")
+    for key, count in sorted(verdicts.items(), key=lambda item: -item[1]):
+        print(f"  {count:>6}  {key}")
+    if not args.raw:
+        print(f"\nCircuit breaker: {firebase_utils.breaker_status()}")
+
+
+if __name__ == "__main__":
+    main()
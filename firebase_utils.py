@@ -3,11 +3,21 @@ from firebase_admin import credentials, firestore
 import hashlib
 import os
 import json
+from record_store import FirestoreRecordStore, InMemoryRecordStore
+from resilience import LOOKUP_ATTEMPT_TIMEOUT, CircuitOpen, ResilientRecordStore
 
 # Initialize Firebase
 cred = None
 db = None
 
+# Where Aadhaar records are looked up: 'firestore' (default) or 'memory'
+RECORD_STORE = os.getenv('RECORD_STORE', 'firestore').lower()
+record_store = None
+
+
+class VerificationUnavailable(Exception):
+    """The record store could not answer (timeouts, errors, open circuit breaker)"""
+
 def initialize_firebase():
     """Initialize Firebase Admin SDK from environment variables or config file"""
     global cred, db
@@ -71,6 +81,47 @@ def initialize_firebase():
     
     return False
 
+def create_memory_store():
+    """Build the in-memory record store from RECORD_STORE_* environment variables"""
+    path = os.getenv('RECORD_STORE_PATH')
+    timeout = os.getenv('RECORD_STORE_TIMEOUT')
+    seed = os.getenv('RECORD_STORE_SEED')
+    options = {
+        "latency": os.getenv('RECORD_STORE_LATENCY'),
+        "error_rate": float(os.getenv('RECORD_STORE_ERROR_RATE', '0')),
+        "timeout": float(timeout) if timeout else None,
+        "seed": int(seed) if seed else None,
+    }
+    if path:
+        store = InMemoryRecordStore.from_jsonl(path, **options)
+    else:
+        store = InMemoryRecordStore(**options)
+    print(f"✅ In-memory record store ready ({len(store)} records)")
+    return store
+
+def get_record_store():
+    """Return the configured record store, or None when no backend is available (TEST MODE)"""
+    global record_store
+    if record_store is None:
+        if RECORD_STORE == 'memory':
+            record_store = ResilientRecordStore(create_memory_store())
+        else:
+            if not db:
+                initialize_firebase()
+            if db:
+                record_store = ResilientRecordStore(FirestoreRecordStore(db, timeout=LOOKUP_ATTEMPT_TIMEOUT))
+    return record_store
+
+def set_record_store(store, resilient=True):
+    """Swap the record store (benchmarks, offline runs)"""
+    global record_store
+    record_store = ResilientRecordStore(store) if resilient else store
+
+def breaker_status():
+    """Circuit breaker state of the record store, or None before it is initialized"""
+    breaker = getattr(record_store, 'breaker', None)
+    return breaker.snapshot() if breaker else None
+
 def hash_aadhaar(aadhaar_number):
     """Create SHA-256 hash of Aadhaar number"""
     if not aadhaar_number:
@@ -90,61 +141,44 @@ def normalize_name(name):
     return " ".join(name.upper().split())
 
 def fetch_firebase_data(aadhaar_number):
-    """Fetch user data from Firebase Firestore using Aadhaar number directly"""
-    if not db:
-        initialize_firebase()
+    """
+    Fetch user data from the record store using Aadhaar number directly.
+    Returns None when no record matches; raises VerificationUnavailable when
+    the store could not answer, so outages are not mistaken for bad numbers.
+    """
+    store = get_record_store()
     
-    if not db:
+    if store is None:
         return None
     
     try:
         # Try as integer first (for number type storage in Firebase)
         try:
             aadhaar_int = int(aadhaar_number)
-            users_ref = db.collection('mock_aadhaar_users')
-            
-            # Try querying with aadhaar_hash field first
-            query = users_ref.where('aadhaar_hash', '==', aadhaar_int).limit(1)
-            results = query.get()
             
-            if results:
-                for doc in results:
-                    return doc.to_dict()
-            
-            # If not found, try aadhaar_number field
-            query = users_ref.where('aadhaar_number', '==', aadhaar_int).limit(1)
-            results = query.get()
-            
-            if results:
-                for doc in results:
-                    return doc.to_dict()
+            # Try querying with aadhaar_hash field first, then aadhaar_number field
+            for field in ('aadhaar_hash', 'aadhaar_number'):
+                record = store.find_one(field, aadhaar_int)
+                if record:
+                    return record
         except (ValueError, TypeError):
             pass
         
         # If not found, try as string
         aadhaar_str = str(aadhaar_number)
-        users_ref = db.collection('mock_aadhaar_users')
-        
-        # Try aadhaar_hash as string
-        query = users_ref.where('aadhaar_hash', '==', aadhaar_str).limit(1)
-        results = query.get()
         
-        if results:
-            for doc in results:
-                return doc.to_dict()
-        
-        # Try aadhaar_number as string
-        query = users_ref.where('aadhaar_number', '==', aadhaar_str).limit(1)
-        results = query.get()
-        
-        if results:
-            for doc in results:
-                return doc.to_dict()
+        for field in ('aadhaar_hash', 'aadhaar_number'):
+            record = store.find_one(field, aadhaar_str)
+            if record:
+                return record
         
         return None
+    except CircuitOpen as e:
+        raise VerificationUnavailable(str(e)) from e
     except Exception as e:
+        # Timeouts, injected faults and Firestore client errors (UNAVAILABLE, DEADLINE_EXCEEDED...)
         print(f"❌ Error fetching from Firebase: {e}")
-        return None
+        raise VerificationUnavailable(str(e)) from e
 
 def verify_kyc_data(ocr_data, firebase_data):
     """
@@ -181,6 +215,7 @@ def process_verification(ocr_data):
         return {
             "verified": False,
             "error": "No Aadhaar number found in OCR data",
+            "error_code": "missing_aadhaar_number",
             "match_details": None,
             "firebase_data": None,
             "test_mode": False
@@ -190,19 +225,21 @@ def process_verification(ocr_data):
         return {
             "verified": False,
             "error": "No name found in PAN card OCR data",
+            "error_code": "missing_pan_name",
             "match_details": None,
             "firebase_data": None,
             "test_mode": False
         }
     
-    # Initialize Firebase if not already done
-    firebase_initialized = initialize_firebase()
+    # Initialize the record store (Firebase) if not already done
+    store = get_record_store()
     
-    # If Firebase not initialized, return test mode response
-    if not firebase_initialized or not db:
+    # If no record store is available, return test mode response
+    if store is None:
         return {
             "verified": False,
             "error": "Firebase not configured - Running in TEST MODE. OCR extraction successful!",
+            "error_code": "test_mode",
             "match_details": None,
             "firebase_data": None,
             "test_mode": True,
@@ -211,12 +248,24 @@ def process_verification(ocr_data):
         }
     
     # Fetch Firebase data using Aadhaar number
-    firebase_data = fetch_firebase_data(aadhaar_number)
+    try:
+        firebase_data = fetch_firebase_data(aadhaar_number)
+    except VerificationUnavailable:
+        return {
+            "verified": False,
+            "error": "Verification temporarily unavailable. Please try again shortly.",
+            "error_code": "unavailable",
+            "match_details": None,
+            "firebase_data": None,
+            "test_mode": False,
+            "unavailable": True
+        }
     
     if not firebase_data:
         return {
             "verified": False,
             "error": "Invalid Aadhaar number",
+            "error_code": "not_found",
             "match_details": {
                 "aadhaar_match": False,
                 "record_found": False,
@@ -242,6 +291,7 @@ def process_verification(ocr_data):
         return {
             "verified": False,
             "error": f"Name mismatch: PAN card name '{pan_name}' does not match Firebase name '{firebase_name}'",
+            "error_code": "name_mismatch",
             "match_details": {
                 "aadhaar_match": True,
                 "record_found": True,
@@ -267,6 +317,7 @@ def process_verification(ocr_data):
     return {
         "verified": True,
         "error": None,
+        "error_code": None,
         "match_details": {
             "aadhaar_match": True,
             "record_found": True,
@@ -40,4 +40,5 @@ if __name__ == "__main__":
     print("3. Add a new document")
     print("4. Copy and paste the JSON above")
     print("5. Important: Store 'aadhaar_number' field with full Aadhaar")
+    print("\n💡 For load testing, seed_records.py generates records in bulk")
     print("\n" + "=" * 50)
@@ -0,0 +1,18 @@
+"""
+Small greyscale helpers shared by the image analysis modules.
+"""
+import numpy as np
+
+
+def otsu_threshold(arr):
+    """Otsu's threshold of a uint8 array; None when it has a single grey level"""
+    if arr.size == 0 or arr.min() == arr.max():
+        return None
+    hist = np.bincount(arr.ravel(), minlength=256).astype(np.float64)
+    weights = np.cumsum(hist)
+    means = np.cumsum(hist * np.arange(256))
+    total, total_mean = weights[-1], means[-1]
+    background = total - weights
+    with np.errstate(divide='ignore', invalid='ignore'):
+        between = (total_mean * weights - means * total) ** 2 / (weights * background)
+    return int(np.nanargmax(between[:-1]))
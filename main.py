@@ -1,36 +1,154 @@
 from fastapi import FastAPI, UploadFile, File, Request, Form
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
-from PIL import Image
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image, UnidentifiedImageError
+import asyncio
 import json
+import os
+import time
 import uuid
-from ocr_utils import ocr_text, extract_pan_details, extract_aadhaar_details
-from firebase_utils import process_verification, initialize_firebase
+import metrics
+from admission import (
+    REQUEST_DEADLINE_SECONDS, AdmissionRejected, ConcurrencyLimiter, Deadline, RateLimiter,
+    client_identity
+)
+from ocr_service import OcrServiceUnavailable
+from ocr_utils import confirm_field, locate_field, read_pan, read_aadhaar
+from quality import check_quality
+from near_duplicates import DUPLICATE_DETECTION, duplicate_index, image_hash
+from audit import audit_trail, build_audit_record, mask_aadhaar
+from profiling import is_admin, request_profiler
+from session_events import SessionChannel
+from session_tokens import (
+    SESSION_TOKENS_ENABLED, InvalidSessionToken, issue_session_token, peek_session_token,
+    redeem_session_token
+)
+from firebase_utils import process_verification, get_record_store, breaker_status
 
 app = FastAPI()
 
 templates = Jinja2Templates(directory="templates")
+
+# Uploads are downscaled in the browser to this long edge; the server decodes
+# full-size JPEGs at a reduced scale close to it
+UPLOAD_MAX_EDGE = int(os.getenv('UPLOAD_MAX_EDGE', '1600'))
+UPLOAD_JPEG_QUALITY = float(os.getenv('UPLOAD_JPEG_QUALITY', '0.85'))
+templates.env.globals.update(upload_max_edge=UPLOAD_MAX_EDGE, upload_jpeg_quality=UPLOAD_JPEG_QUALITY)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # Store processing sessions temporarily (in production, use Redis or similar)
 processing_sessions = {}
 
+# Admission control in front of /upload
+rate_limiter = RateLimiter()
+ocr_limiter = ConcurrencyLimiter()
+
+def shed_response(rejection):
+    """Render a load-shedding rejection with a Retry-After hint"""
+    return HTMLResponse(
+        content=f"<h1>{rejection.detail}</h1>",
+        status_code=rejection.status_code,
+        headers={"Retry-After": str(rejection.retry_after)}
+    )
+
+def load_and_check(upload_file, label):
+    """Decode an uploaded image and run the quality gate. Returns (image, error)"""
+    try:
+        img = Image.open(upload_file.file)
+        # Let the JPEG decoder skip detail OCR doesn't need (DCT scaling to >= UPLOAD_MAX_EDGE)
+        long_edge = max(img.size)
+        if long_edge > UPLOAD_MAX_EDGE:
+            scale = UPLOAD_MAX_EDGE / long_edge
+            img.draft('RGB', (int(img.width * scale), int(img.height * scale)))
+        img.load()
+    except (UnidentifiedImageError, OSError):
+        metrics.inc("quality.rejected.unreadable")
+        return None, f"{label} file is not a readable image. Upload a JPG or PNG photo."
+
+    ok, message, scores = check_quality(img, label)
+    for name in ("sharpness", "brightness", "contrast", "glare", "min_side"):
+        metrics.observe(f"quality.{name}", scores[name])
+    if not ok:
+        metrics.inc(f"quality.rejected.{scores['reason']}")
+        return None, message
+    return img, None
+
 # Initialize Firebase on startup (graceful failure)
 @app.on_event("startup")
 async def startup_event():
     print("\n" + "="*60)
     print("🚀 KYC VERIFICATION SYSTEM STARTING...")
     print("="*60)
-    success = initialize_firebase()
+    success = get_record_store() is not None
     if success:
         print("\n✅ System ready with Firebase verification enabled")
     else:
         print("\n⚠️  System ready in TEST MODE (Firebase disabled)")
         print("   OCR extraction will work, but verification is disabled.")
         print("   Configure Firebase to enable full verification.")
+    audit_trail.start()
     print("="*60 + "\n")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Flush buffered audit records before the worker exits
+    await run_in_threadpool(audit_trail.stop)
+
+@app.get("/metrics")
+def get_metrics():
+    metrics.set_gauge("admission.in_flight", ocr_limiter.in_flight)
+    metrics.set_gauge("admission.waiting", ocr_limiter.waiting)
+    metrics.set_gauge("record_store.breaker", breaker_status())
+    return metrics.snapshot()
+
+@app.get("/admin/profiling")
+def profiling_status(request: Request):
+    if not is_admin(request):
+        return JSONResponse({"error": "Forbidden"}, status_code=403)
+    return request_profiler.status()
+
+@app.post("/admin/profiling")
+def configure_profiling(
+    request: Request,
+    enabled: bool,
+    sample_rate: float = None,
+    memory: bool = None,
+    interval: float = None
+):
+    """Switch sampled request profiling on/off, e.g. ?enabled=true&sample_rate=0.1&memory=true"""
+    if not is_admin(request):
+        return JSONResponse({"error": "Forbidden"}, status_code=403)
+    print(f"🩺 Profiling {'enabled' if enabled else 'disabled'} (sample_rate={sample_rate}, memory={memory})", flush=True)
+    return request_profiler.configure(enabled, sample_rate, memory, interval)
+
+@app.delete("/admin/profiling")
+def reset_profiling(request: Request):
+    if not is_admin(request):
+        return JSONResponse({"error": "Forbidden"}, status_code=403)
+    request_profiler.reset()
+    return request_profiler.status()
+
+@app.get("/admin/profiling/flamegraph")
+def profiling_flamegraph(request: Request):
+    """Collapsed stacks for flamegraph.pl / speedscope"""
+    if not is_admin(request):
+        return JSONResponse({"error": "Forbidden"}, status_code=403)
+    return PlainTextResponse(
+        request_profiler.collapsed_stacks(),
+        headers={"Content-Disposition": "attachment; filename=upload.collapsed"}
+    )
+
+@app.get("/admin/profiling/allocations")
+def profiling_allocations(request: Request):
+    if not is_admin(request):
+        return JSONResponse({"error": "Forbidden"}, status_code=403)
+    return PlainTextResponse(
+        request_profiler.allocation_report(),
+        headers={"Content-Disposition": "attachment; filename=allocations.txt"}
+    )
+
 @app.get("/")
 def home(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
@@ -39,26 +157,235 @@ def home(request: Request):
 async def upload(
     request: Request,
     pan_image: UploadFile = File(...),
-    aadhaar_image: UploadFile = File(...)
+    aadhaar_image: UploadFile = File(...),
+    client_resized: str = Form(None)
 ):
+    # Per-client rate limit before any work is accepted
+    allowed, retry_after = rate_limiter.try_acquire(client_identity(request))
+    if not allowed:
+        metrics.inc("admission.rate_limited")
+        return shed_response(AdmissionRejected(
+            429, "Too many uploads. Please wait before trying again.", retry_after
+        ))
+
+    deadline = Deadline()
+    metrics.inc("upload.client_resized" if client_resized else "upload.original")
+    for upload_file in (pan_image, aadhaar_image):
+        if upload_file.size is not None:
+            metrics.observe("upload.bytes", upload_file.size)
+
+    # Decode and gate image quality before spending any OCR capacity
+    pan_img, error = await run_in_threadpool(load_and_check, pan_image, "PAN card")
+    if not error:
+        aadhaar_img, error = await run_in_threadpool(load_and_check, aadhaar_image, "Aadhaar card")
+    if error:
+        print(f"⚠️  Upload rejected by quality gate: {error}", flush=True)
+        return templates.TemplateResponse(
+            "index.html", {"request": request, "error": error}, status_code=422
+        )
+
+    # Perceptual hashes of the decoded images, to spot re-uploads of the same photos
+    fingerprints = None
+    if DUPLICATE_DETECTION != "off":
+        fingerprints = {
+            "pan": await run_in_threadpool(image_hash, pan_img),
+            "aadhaar": await run_in_threadpool(image_hash, aadhaar_img),
+        }
+
+    # Wait for OCR capacity within the request's time budget
+    try:
+        slot = await ocr_limiter.acquire(deadline)
+    except AdmissionRejected as rejection:
+        metrics.inc("admission.shed")
+        return shed_response(rejection)
+
+    metrics.inc("admission.admitted")
+
     # Generate unique session ID
     session_id = str(uuid.uuid4())
-    
-    # Open images and start OCR processing immediately
-    pan_img = Image.open(pan_image.file)
-    aadhaar_img = Image.open(aadhaar_image.file)
+
+    # Process in the background and stream each field to the OTP page as it is extracted
+    channel = SessionChannel()
+    processing_sessions[session_id] = {
+        "status": "processing",
+        "channel": channel,
+        "client": client_identity(request),
+        "fingerprints": fingerprints,
+    }
+    processing_sessions[session_id]["task"] = asyncio.create_task(
+        run_pipeline(session_id, pan_img, aadhaar_img, deadline, slot, channel)
+    )
+
+    if SESSION_TOKENS_ENABLED:
+        return await render_stateless_otp(request, session_id)
+
+    # Return OTP page (OCR processing done in background)
+    return templates.TemplateResponse(
+        "otp.html",
+        {
+            "request": request,
+            "session_id": session_id
+        }
+    )
+
+async def render_stateless_otp(request, session_id):
+    """
+    Stateless mode: wait for processing, then carry the results in a signed,
+    encrypted token so /verify-otp can land on any worker or node
+    """
+    session = processing_sessions[session_id]
+    await session["task"]
+    processing_sessions.pop(session_id, None)
+
+    if session["status"] == "error":
+        return HTMLResponse(content=f"<h1>{session['error']}</h1>", status_code=503)
+
+    session_token = issue_session_token(
+        {key: session[key] for key in ("pan", "aadhaar", "verification", "ocr_data")},
+        client_identity(request)
+    )
+    return templates.TemplateResponse(
+        "otp.html",
+        {
+            "request": request,
+            "session_id": session_id,
+            "session_token": session_token,
+            "pan": session["pan"],
+            "aadhaar": session["aadhaar"],
+            "verification": session["verification"],
+            "verdict_message": verdict_message(session["verification"])
+        }
+    )
+
+async def run_pipeline(session_id, pan_img, aadhaar_img, deadline, slot, channel):
+    """Run OCR and verification for a session, publishing progress events"""
+    session = processing_sessions[session_id]
+    try:
+        await process_upload(session_id, pan_img, aadhaar_img, deadline, channel)
+    except AdmissionRejected as rejection:
+        metrics.inc("admission.deadline_exceeded")
+        session.update(status="error", error=rejection.detail, error_code="deadline_exceeded")
+        channel.publish("failure", {"message": rejection.detail})
+    except OcrServiceUnavailable as e:
+        print(f"❌ {e}", flush=True)
+        metrics.inc("ocr_service.unavailable")
+        message = "Document reader is temporarily unavailable. Please try again shortly."
+        session.update(status="error", error=message, error_code="ocr_unavailable")
+        channel.publish("failure", {"message": message})
+    except Exception as e:
+        print(f"❌ Processing failed for session {session_id}: {e}", flush=True)
+        message = "Document processing failed. Please try again."
+        session.update(status="error", error=message, error_code="processing_failed")
+        channel.publish("failure", {"message": message})
+    finally:
+        ocr_limiter.release(slot)
+        channel.close()
+        # record() writes the local log itself when its buffer is full; keep that off the loop
+        await run_in_threadpool(audit_trail.record, build_audit_record(session_id, session))
+
+# Fields masked before they leave the server (the page only ever shows these masked)
+PUBLISHED_FIELD_MASKS = {("aadhaar", "aadhaar_number"): mask_aadhaar}
+
+def publish_fields(channel, document, data, fields):
+    for field in fields:
+        value = data.get(field)
+        mask = PUBLISHED_FIELD_MASKS.get((document, field))
+        if mask and value:
+            value = mask(value)
+        channel.publish("field", {"document": document, "field": field, "value": value})
+
+# Verdict text for the OTP page. verification["error"] can quote the stored
+# record (the Firebase name), so before the OTP only codes that reveal nothing
+# about it get a specific message; the details are on the result page
+VERDICT_MESSAGES = {
+    "unavailable": "Verification temporarily unavailable. Please try again shortly.",
+    "missing_aadhaar_number": "Aadhaar number could not be read",
+    "missing_pan_name": "Name could not be read from the PAN card",
+}
+
+def verdict_message(verification):
+    return VERDICT_MESSAGES.get(verification.get("error_code"), "Verification failed")
+
+# The field that must have been extracted before a read is worth reusing
+DUPLICATE_KEY_FIELDS = {"pan": "pan_number", "aadhaar": "aadhaar_number"}
+
+def record_duplicate(session, document, entry, distance, same_client):
+    session.setdefault("duplicates", {})[document] = {
+        "session_id": entry["session_id"], "distance": distance, "same_client": same_client
+    }
+    metrics.inc(f"duplicates.{document}.detected")
+    print(f"♻️  {document} image matches session {entry['session_id']} (distance {distance})", flush=True)
+
+async def read_document(session_id, document, read, img, stage):
+    """
+    OCR one card, checking the near-duplicate index first. Cards of one type
+    share a template, so a close hash only shortlists an earlier upload: it is
+    a duplicate once the key field reads the same. In reuse mode, a recent
+    read by the same client is returned after re-reading just the key-field
+    box of this image; everything else runs full OCR.
+    """
+    session = processing_sessions[session_id]
+    field = DUPLICATE_KEY_FIELDS[document]
+    client = session.get("client")
+    fingerprint = (session.get("fingerprints") or {}).get(document)
+    matches = duplicate_index.lookup(document, fingerprint) if fingerprint is not None else []
+
+    if DUPLICATE_DETECTION == "reuse":
+        for distance, entry in matches:
+            if entry["client"] != client or not entry["region"]:
+                continue
+            confirmed = await run_in_threadpool(
+                confirm_field, img, document, field, entry["region"], entry["details"][field]
+            )
+            if confirmed:
+                record_duplicate(session, document, entry, distance, True)
+                metrics.inc(f"duplicates.{document}.reused")
+                return dict(entry["details"])
+            # One box re-read per upload at most; otherwise fall through to full OCR
+            break
+
+    data, result = await run_in_threadpool(stage(read, f"{document}_ocr"), img, with_result=True)
+    if matches:
+        value = data.get(field)
+        same_card = [(d, e) for d, e in matches if value and e["details"][field] == value]
+        if same_card:
+            distance, entry = same_card[0]
+            record_duplicate(session, document, entry, distance, entry["client"] == client)
+        else:
+            metrics.inc(f"duplicates.{document}.unconfirmed")
+    if fingerprint is not None and data.get(field):
+        duplicate_index.add(document, fingerprint, {
+            "session_id": session_id,
+            "client": client,
+            "details": dict(data),
+            "region": locate_field(result, data[field]) if result is not None else None,
+        })
+    return data
+
+async def process_upload(session_id, pan_img, aadhaar_img, deadline, channel):
+    timings = processing_sessions[session_id].setdefault("timings", {})
+    profiled = request_profiler.should_sample()
+    stage = request_profiler.wrap if profiled else (lambda fn, label: fn)
 
     print("\n" + "="*70, flush=True)
     print("🔄 STARTING OCR PROCESSING...", flush=True)
     print(f"📋 Session ID: {session_id}", flush=True)
     print("="*70 + "\n", flush=True)
 
-    # Extract text from both PAN and Aadhaar cards
-    pan_lines = ocr_text(pan_img)
-    pan_data = extract_pan_details(pan_lines)
+    # Extract text from both PAN and Aadhaar cards (off the event loop)
+    deadline.check("reading the PAN card")
+    started = time.perf_counter()
+    pan_data = await read_document(session_id, "pan", read_pan, pan_img, stage)
+    timings["pan_ocr"] = time.perf_counter() - started
+    metrics.observe("stage.pan_ocr_seconds", timings["pan_ocr"])
+    publish_fields(channel, "pan", pan_data, ("pan_number", "name", "dob"))
     
-    aadhaar_lines = ocr_text(aadhaar_img)
-    aadhaar_data = extract_aadhaar_details(aadhaar_lines)
+    deadline.check("reading the Aadhaar card")
+    started = time.perf_counter()
+    aadhaar_data = await read_document(session_id, "aadhaar", read_aadhaar, aadhaar_img, stage)
+    timings["aadhaar_ocr"] = time.perf_counter() - started
+    metrics.observe("stage.aadhaar_ocr_seconds", timings["aadhaar_ocr"])
+    publish_fields(channel, "aadhaar", aadhaar_data, ("aadhaar_number",))
 
     # Prepare data for verification
     ocr_data = {
@@ -79,10 +406,18 @@ async def upload(
     print("📊 AADHAAR CARD OCR EXTRACTION", flush=True)
     print("="*70, flush=True)
     print(f"Aadhaar Number: {aadhaar_data.get('aadhaar_number', 'Not extracted')}", flush=True)
+    if aadhaar_data.get('name_local'):
+        print(f"Name (local script): {aadhaar_data['name_local']}", flush=True)
     print("="*70 + "\n", flush=True)
 
     # Verify against Firebase
-    verification_result = process_verification(ocr_data)
+    deadline.check("verifying documents")
+    started = time.perf_counter()
+    verification_result = await run_in_threadpool(stage(process_verification, "verification"), ocr_data)
+    timings["verification"] = time.perf_counter() - started
+    metrics.observe("stage.verification_seconds", timings["verification"])
+    if verification_result.get("unavailable"):
+        metrics.inc("verification.unavailable")
     
     # 🔥 PRINT VERIFICATION RESULT TO TERMINAL
     print("\n" + "="*70, flush=True)
@@ -100,29 +435,48 @@ async def upload(
         print("="*70 + "\n", flush=True)
 
     # Store results in session
-    processing_sessions[session_id] = {
+    processing_sessions[session_id].update({
+        "status": "complete",
         "pan": pan_data,
         "aadhaar": aadhaar_data,
         "verification": verification_result,
         "ocr_data": ocr_data
-    }
+    })
+    channel.publish("verdict", {
+        "verified": verification_result.get("verified", False),
+        "error_code": verification_result.get("error_code"),
+        "message": verdict_message(verification_result),
+        "test_mode": verification_result.get("test_mode", False)
+    })
 
     print("✅ OCR PROCESSING COMPLETE - Waiting for OTP verification\n", flush=True)
 
-    # Return OTP page (OCR processing done in background)
-    return templates.TemplateResponse(
-        "otp.html",
-        {
-            "request": request,
-            "session_id": session_id
-        }
+@app.get("/events/{session_id}")
+async def session_events(request: Request, session_id: str):
+    """Server-Sent Events stream of extracted fields and the verification verdict"""
+    session_data = processing_sessions.get(session_id)
+    if not session_data:
+        return HTMLResponse(content="<h1>Session expired. Please try again.</h1>", status_code=404)
+
+    # Resume after the last event the browser saw; ignore malformed ids
+    try:
+        last_event_id = int(request.headers.get("last-event-id", ""))
+    except ValueError:
+        last_event_id = None
+    if last_event_id is not None and last_event_id < 0:
+        last_event_id = None
+    return StreamingResponse(
+        session_data["channel"].stream(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 @app.post("/verify-otp", response_class=HTMLResponse)
 async def verify_otp(
     request: Request,
     session_id: str = Form(...),
-    otp: str = Form(...)
+    otp: str = Form(...),
+    session_token: str = Form(None)
 ):
     print("\n" + "="*70, flush=True)
     print("🔐 OTP VERIFICATION", flush=True)
@@ -133,21 +487,47 @@ async def verify_otp(
 
     # Validate OTP format (6 digits, numbers only)
     if not otp or len(otp) != 6 or not otp.isdigit():
-        return templates.TemplateResponse(
-            "otp.html",
-            {
-                "request": request,
-                "session_id": session_id,
-                "error": "Invalid OTP. Please enter 6 digits."
-            }
-        )
+        context = {
+            "request": request,
+            "session_id": session_id,
+            "session_token": session_token,
+            "error": "Invalid OTP. Please enter 6 digits."
+        }
+        # Stateless pages don't stream, so show the extracted fields carried in the token
+        if SESSION_TOKENS_ENABLED and session_token:
+            try:
+                session_data = peek_session_token(session_token, client_identity(request))
+            except InvalidSessionToken as e:
+                metrics.inc("session_tokens.rejected")
+                return HTMLResponse(content=f"<h1>{e}</h1>", status_code=400)
+            context.update({key: session_data[key] for key in ("pan", "aadhaar", "verification")})
+            context["verdict_message"] = verdict_message(session_data["verification"])
+        return templates.TemplateResponse("otp.html", context)
 
-    # Retrieve processing results from session
-    session_data = processing_sessions.get(session_id)
+    # Retrieve processing results from the signed token or the local session
+    if SESSION_TOKENS_ENABLED and session_token:
+        try:
+            session_data = redeem_session_token(session_token, client_identity(request))
+        except InvalidSessionToken as e:
+            metrics.inc("session_tokens.rejected")
+            return HTMLResponse(content=f"<h1>{e}</h1>", status_code=400)
+        session_data["status"] = "complete"
+    else:
+        session_data = processing_sessions.get(session_id)
     
     if not session_data:
         return HTMLResponse(content="<h1>Session expired. Please try again.</h1>", status_code=400)
 
+    # Documents may still be processing if the OTP was entered quickly
+    if session_data["status"] == "processing":
+        try:
+            await asyncio.wait_for(asyncio.shield(session_data["task"]), timeout=REQUEST_DEADLINE_SECONDS)
+        except asyncio.TimeoutError:
+            return HTMLResponse(content="<h1>Documents are still processing. Please try again.</h1>", status_code=503)
+
+    if session_data["status"] == "error":
+        return HTMLResponse(content=f"<h1>{session_data['error']}</h1>", status_code=503)
+
     print("✅ OTP VERIFIED - Showing results\n", flush=True)
 
     # Return results page
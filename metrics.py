@@ -0,0 +1,59 @@
+"""
+Lightweight in-process metrics for the KYC service.
+Counters, gauges and timing summaries are kept per worker process
+and exposed as JSON on the /metrics endpoint.
+"""
+import threading
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_timings = {}
+
+
+def inc(name, value=1):
+    """Increment a counter"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name, value):
+    """Set a gauge to its current value"""
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name, value):
+    """Record a sample (seconds, scores, sizes...) into a running summary"""
+    with _lock:
+        summary = _timings.get(name)
+        if summary is None:
+            _timings[name] = {"count": 1, "sum": value, "min": value, "max": value}
+            return
+        summary["count"] += 1
+        summary["sum"] += value
+        summary["min"] = min(summary["min"], value)
+        summary["max"] = max(summary["max"], value)
+
+
+def mean(name, default=None):
+    """Average of the samples recorded under `name`"""
+    with _lock:
+        summary = _timings.get(name)
+        if not summary or not summary["count"]:
+            return default
+        return summary["sum"] / summary["count"]
+
+
+def snapshot():
+    """Return a JSON-serializable copy of all metrics"""
+    with _lock:
+        timings = {
+            name: dict(summary, avg=summary["sum"] / summary["count"])
+            for name, summary in _timings.items()
+        }
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "summaries": timings,
+        }
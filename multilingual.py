@@ -0,0 +1,129 @@
+"""
+Script-aware recognition for bilingual cards.
+
+Aadhaar cards print the name and labels in Hindi (or a regional script)
+next to English. Instead of loading every language model up front, each
+detected text region is classified by script and only the non-Latin ones
+are re-recognized by a reader for that script. Script readers are
+recognition-only (no second detector), loaded on first use and kept in a
+small LRU cache so model residency stays bounded.
+
+Devanagari (and Bengali-Assamese) regions are recognized by their headline
+(shirorekha): a near-continuous horizontal stroke along the top of each
+word, which Latin text does not have.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import metrics
+from imaging import otsu_threshold
+
+OCR_SCRIPT_ROUTING = os.getenv('OCR_SCRIPT_ROUTING', 'on').lower() not in ('0', 'off', 'false')
+OCR_MAX_SCRIPT_READERS = int(os.getenv('OCR_MAX_SCRIPT_READERS', '1'))
+# Fraction of the text width the headline strokes must cover
+SCRIPT_HEADLINE_COVERAGE = float(os.getenv('SCRIPT_HEADLINE_COVERAGE', '0.5'))
+# Crops shorter than this (pixels) are too small to classify
+SCRIPT_MIN_HEIGHT = int(os.getenv('SCRIPT_MIN_HEIGHT', '12'))
+
+
+def _parse_script_languages(spec):
+    """'devanagari:hi' or 'devanagari:hi+mr' -> {'devanagari': ('hi', 'mr', 'en')}"""
+    mapping = {}
+    for item in spec.split(','):
+        script, _, languages = item.partition(':')
+        if script.strip() and languages.strip():
+            langs = [lang.strip() for lang in languages.split('+') if lang.strip()]
+            mapping[script.strip().lower()] = tuple(langs + (['en'] if 'en' not in langs else []))
+    return mapping
+
+
+# Which reader languages handle each detected script; 'bn' suits Bengali/Assamese states
+SCRIPT_LANGUAGES = _parse_script_languages(os.getenv('OCR_SCRIPT_LANGUAGES', 'devanagari:hi'))
+
+
+def _ink_mask(crop):
+    """Dark-on-light ink mask of a greyscale crop (Otsu threshold)"""
+    threshold = otsu_threshold(crop)
+    if threshold is None:
+        return np.zeros(crop.shape, dtype=bool)
+    ink = crop <= threshold
+    # Light text on a dark band: the "ink" is whatever covers less of the crop
+    return ~ink if ink.mean() > 0.5 else ink
+
+
+def _long_runs(row, min_length):
+    """Total length of the runs of True values at least `min_length` long"""
+    padded = np.concatenate(([False], row, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    runs = edges[1::2] - edges[::2]
+    return int(runs[runs >= min_length].sum())
+
+
+def headline_coverage(crop):
+    """
+    Fraction of the text's width covered, in one row of its upper half, by
+    unbroken strokes longer than the text is tall. A headline joins the
+    letters of each word into one such stroke; the tops of Latin letters are
+    separated by gaps and never reach that length.
+    """
+    ink = _ink_mask(crop)
+    rows = np.flatnonzero(ink.any(axis=1))
+    cols = np.flatnonzero(ink.any(axis=0))
+    if len(rows) < SCRIPT_MIN_HEIGHT or len(cols) < SCRIPT_MIN_HEIGHT:
+        return 0.0
+    ink = ink[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+    height, width = ink.shape
+
+    best = 0
+    for y in range(max(1, height // 2)):
+        # A headline is a few pixels thick; merge each row with the one below
+        band = ink[y] | ink[min(height - 1, y + 1)]
+        best = max(best, _long_runs(band, height))
+    return best / width
+
+
+def detect_script(crop):
+    """Classify a greyscale text crop as 'devanagari' (headline script) or 'latin'"""
+    if crop.shape[0] < SCRIPT_MIN_HEIGHT:
+        return 'latin'
+    return 'devanagari' if headline_coverage(crop) >= SCRIPT_HEADLINE_COVERAGE else 'latin'
+
+
+class ScriptReaderCache:
+    """Lazily loaded, LRU-capped recognition-only easyocr readers keyed by language set"""
+
+    def __init__(self, max_readers=OCR_MAX_SCRIPT_READERS):
+        self.max_readers = max(1, max_readers)
+        self._readers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, languages):
+        languages = tuple(languages)
+        with self._lock:
+            reader = self._readers.get(languages)
+            if reader is not None:
+                self._readers.move_to_end(languages)
+                return reader
+
+            import easyocr
+
+            print(f"🔧 Loading EasyOCR recognizer for {'+'.join(languages)}...", flush=True)
+            reader = easyocr.Reader(list(languages), gpu=False, detector=False)
+            metrics.inc("ocr.script_reader_loads")
+            self._readers[languages] = reader
+            while len(self._readers) > self.max_readers:
+                evicted, _ = self._readers.popitem(last=False)
+                metrics.inc("ocr.script_reader_evictions")
+                print(f"♻️  Evicted EasyOCR recognizer for {'+'.join(evicted)}", flush=True)
+            metrics.set_gauge("ocr.script_readers_resident", ['+'.join(k) for k in self._readers])
+            return reader
+
+    def resident(self):
+        with self._lock:
+            return list(self._readers)
+
+
+script_readers = ScriptReaderCache()
@@ -0,0 +1,159 @@
+"""
+Perceptual-hash index of recently processed card images.
+
+Clients often retry with the same photo re-encoded or resized, so the bytes
+differ but the picture barely does. Each decoded upload gets a perceptual
+hash (dHash or pHash); hashes live in per-document BK-trees, so a lookup
+finds every recent image within a Hamming distance without scanning them
+all. Entries expire after a TTL.
+
+A close hash is only a candidate. Cards of one type share a template and
+differ in a few lines of text, so different people's cards can hash as close
+as re-encoded copies of one card (20 bits apart at 32x32 has been measured).
+Callers confirm a candidate by its key field (the PAN or Aadhaar number)
+before flagging it or reusing its OCR output. A fresh photograph of the
+same card (new angle, lighting, crop) is generally NOT matched.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from PIL import Image
+
+import metrics
+
+# off | flag (record likely duplicates for review) | reuse (also skip OCR for the same client)
+DUPLICATE_DETECTION = os.getenv('DUPLICATE_DETECTION', 'flag').lower()
+PHASH_ALGORITHM = os.getenv('PHASH_ALGORITHM', 'dhash').lower()
+# 32x32 hashes (1024 bits): cards share a template, so 64-bit hashes are far too coarse
+PHASH_SIZE = int(os.getenv('PHASH_SIZE', '32'))
+PHASH_MAX_DISTANCE = int(os.getenv('PHASH_MAX_DISTANCE', '20'))
+PHASH_TTL_SECONDS = float(os.getenv('PHASH_TTL_SECONDS', '1800'))
+PHASH_MAX_ENTRIES = int(os.getenv('PHASH_MAX_ENTRIES', '20000'))
+
+
+def _bits_to_int(bits):
+    value = 0
+    for bit in bits.ravel():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def dhash(pil_img, hash_size=PHASH_SIZE):
+    """Difference hash: sign of horizontal gradients on a (size+1) x size thumbnail"""
+    small = np.asarray(pil_img.convert('L').resize((hash_size + 1, hash_size), Image.BOX), dtype=np.int16)
+    return _bits_to_int(small[:, 1:] > small[:, :-1])
+
+
+def _dct_matrix(n):
+    k = np.arange(n)
+    matrix = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+def phash(pil_img, hash_size=PHASH_SIZE):
+    """DCT hash: low-frequency DCT coefficients of a 4x-size thumbnail above their median"""
+    n = hash_size * 4
+    small = np.asarray(pil_img.convert('L').resize((n, n), Image.BOX), dtype=np.float64)
+    dct = _dct_matrix(n)
+    low = (dct @ small @ dct.T)[:hash_size, :hash_size]
+    return _bits_to_int(low > np.median(low[1:, 1:]))
+
+
+def image_hash(pil_img):
+    return phash(pil_img) if PHASH_ALGORITHM == 'phash' else dhash(pil_img)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes with Hamming distance"""
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, value, item):
+        self.size += 1
+        if self.root is None:
+            self.root = (value, [item], {})
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (value, [item], {})
+                return
+            node = child
+
+    def search(self, value, max_distance):
+        """[(distance, item)] for every item within max_distance"""
+        found = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node_value, items, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= max_distance:
+                found.extend((distance, item) for item in items)
+            # Triangle inequality: only subtrees at distance d +- max_distance can match
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return found
+
+
+class DuplicateIndex:
+    """Per-document BK-trees of recent image hashes with TTL and size bounds"""
+
+    def __init__(self, max_distance=PHASH_MAX_DISTANCE, ttl=PHASH_TTL_SECONDS, max_entries=PHASH_MAX_ENTRIES):
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._trees = {}
+        self._entries = deque()  # (expires_at, document, hash, entry), oldest first
+        self._dead = 0
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        while self._entries and (self._entries[0][0] <= now or len(self._entries) > self.max_entries):
+            _, _, _, entry = self._entries.popleft()
+            entry["expired"] = True
+            self._dead += 1
+        # BK-trees can't delete in place; rebuild once expired entries dominate
+        if self._dead > len(self._entries):
+            self._trees = {}
+            for _, document, value, entry in self._entries:
+                self._trees.setdefault(document, BKTree()).add(value, entry)
+            self._dead = 0
+            metrics.inc("duplicates.index_rebuilds")
+        metrics.set_gauge("duplicates.indexed_images", len(self._entries))
+
+    def add(self, document, value, entry):
+        now = time.monotonic()
+        entry = dict(entry, expired=False)
+        with self._lock:
+            self._entries.append((now + self.ttl, document, value, entry))
+            self._trees.setdefault(document, BKTree()).add(value, entry)
+            self._evict(now)
+
+    def lookup(self, document, value):
+        """Live entries within max_distance as [(distance, entry)], closest first"""
+        with self._lock:
+            self._evict(time.monotonic())
+            tree = self._trees.get(document)
+            if tree is None:
+                return []
+            matches = [(d, e) for d, e in tree.search(value, self.max_distance) if not e["expired"]]
+        return sorted(matches, key=lambda match: match[0])
+
+
+duplicate_index = DuplicateIndex()
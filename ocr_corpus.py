@@ -0,0 +1,167 @@
+"""
+Build a labeled PAN/Aadhaar image corpus for accuracy-vs-latency sweeps.
+
+Synthetic cards are rendered from seeded records (seed_records.py) and each
+clean card is also written with blur, rotation, glare and JPEG-quality
+augmentations. Labels go to <out>/labels.jsonl, one line per image:
+
+    {"image": "pan_0003_blur.jpg", "document": "pan", "augmentation": "blur",
+     "expected": {"pan_number": "ABCDE1234F", "name": "...", "dob": "..."}}
+
+Real, hand-labeled card photos can be appended to the same file (image
+paths are relative to the labels file).
+
+Example:
+    python ocr_corpus.py --out corpus --count 40 --seed 7
+"""
+import argparse
+import io
+import json
+import os
+import random
+import string
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from seed_records import generate_records
+
+CARD_SIZE = (1280, 808)  # ID-1 card aspect ratio
+
+
+def _font(size, path=None):
+    return ImageFont.truetype(path, size) if path else ImageFont.load_default(size=size)
+
+
+def _card(rng, tint):
+    base = tuple(max(0, min(255, c + rng.randint(-12, 12))) for c in tint)
+    return Image.new("RGB", CARD_SIZE, base)
+
+
+def _dob(record):
+    year, month, day = record["dob"].split("-")
+    return f"{day}/{month}/{year}"
+
+
+def render_pan(record, rng, font_path=None):
+    """PAN card layout: header, name, father's name, DOB, PAN number"""
+    pan = "".join(rng.choice(string.ascii_uppercase) for _ in range(3)) + "P" + record["name"].split()[-1][0].upper()
+    pan += f"{rng.randrange(10000):04d}" + rng.choice(string.ascii_uppercase)
+    name = record["name"].upper()
+    father = f"{record['name'].split()[1]} {record['name'].split()[-1]}".upper()
+    dob = _dob(record)
+
+    img = _card(rng, (214, 232, 240))
+    draw = ImageDraw.Draw(img)
+    header, label, value = _font(46, font_path), _font(30, font_path), _font(44, font_path)
+    ink = (20, 20, 30)
+    draw.text((70, 50), "INCOME TAX DEPARTMENT", font=header, fill=ink)
+    draw.text((760, 50), "GOVT. OF INDIA", font=header, fill=ink)
+    draw.text((70, 170), "Permanent Account Number Card", font=label, fill=ink)
+    draw.text((70, 215), pan, font=_font(56, font_path), fill=ink)
+    draw.text((70, 320), "Name", font=label, fill=ink)
+    draw.text((70, 360), name, font=value, fill=ink)
+    draw.text((70, 450), "Father's Name", font=label, fill=ink)
+    draw.text((70, 490), father, font=value, fill=ink)
+    draw.text((70, 580), "Date of Birth", font=label, fill=ink)
+    draw.text((70, 620), dob, font=value, fill=ink)
+    return img, {"pan_number": pan, "name": name, "dob": dob}
+
+
+def render_aadhaar(record, rng, font_path=None):
+    """Aadhaar front layout: header, name, DOB, gender, grouped 12-digit number"""
+    number = str(record["aadhaar_hash"])
+    dob = _dob(record)
+
+    img = _card(rng, (250, 250, 246))
+    draw = ImageDraw.Draw(img)
+    ink = (15, 15, 15)
+    draw.rectangle([0, 0, CARD_SIZE[0], 110], fill=(255, 153, 51))
+    draw.text((330, 30), "Government of India", font=_font(50, font_path), fill=ink)
+    draw.text((360, 220), record["name"], font=_font(44, font_path), fill=ink)
+    draw.text((360, 300), f"DOB: {dob}", font=_font(40, font_path), fill=ink)
+    draw.text((360, 370), record["gender"].upper(), font=_font(40, font_path), fill=ink)
+    draw.rectangle([60, 200, 300, 480], outline=(120, 120, 120), width=3)
+    draw.text((330, 620), f"{number[:4]} {number[4:8]} {number[8:]}", font=_font(64, font_path), fill=ink)
+    return img, {
+        "aadhaar_number": number,
+        "name": record["name"],
+        "dob": dob,
+        "gender": record["gender"].lower(),
+    }
+
+
+# ---------------- AUGMENTATIONS ----------------
+
+def blur(img, rng):
+    return img.filter(ImageFilter.GaussianBlur(rng.uniform(1.2, 2.5)))
+
+
+def rotate(img, rng):
+    # Hand-held skew plus, sometimes, a sideways or upside-down shot
+    angle = rng.uniform(-6, 6) + rng.choice((0, 0, 90, 180, 270))
+    return img.rotate(angle, expand=True, fillcolor=(90, 90, 90), resample=Image.BICUBIC)
+
+
+def glare(img, rng):
+    overlay = Image.new("L", img.size, 0)
+    width, height = img.size
+    cx, cy = rng.randrange(width), rng.randrange(height)
+    radius = rng.randint(width // 8, width // 4)
+    ImageDraw.Draw(overlay).ellipse([cx - radius, cy - radius // 2, cx + radius, cy + radius // 2], fill=255)
+    overlay = overlay.filter(ImageFilter.GaussianBlur(radius // 4))
+    return Image.composite(Image.new("RGB", img.size, (255, 255, 255)), img, overlay)
+
+
+def jpeg(img, rng):
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=rng.randint(12, 30))
+    buffer.seek(0)
+    return Image.open(buffer).convert("RGB")
+
+
+AUGMENTATIONS = {"blur": blur, "rotate": rotate, "glare": glare, "jpeg": jpeg}
+
+
+def build_corpus(out_dir, count, seed, augmentations=tuple(AUGMENTATIONS), font_path=None):
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    entries = []
+    for index, record in enumerate(generate_records(count, seed)):
+        for document, render in (("pan", render_pan), ("aadhaar", render_aadhaar)):
+            card, expected = render(record, rng, font_path)
+            variants = [("clean", card)] + [(name, AUGMENTATIONS[name](card, rng)) for name in augmentations]
+            for augmentation, img in variants:
+                filename = f"{document}_{index:04d}_{augmentation}.jpg"
+                img.save(os.path.join(out_dir, filename), "JPEG", quality=92)
+                entries.append({
+                    "image": filename,
+                    "document": document,
+                    "augmentation": augmentation,
+                    "expected": expected,
+                })
+    with open(os.path.join(out_dir, "labels.jsonl"), "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a labeled synthetic OCR corpus")
+    parser.add_argument("--out", default="corpus")
+    parser.add_argument("--count", type=int, default=20, help="Synthetic people (one PAN + one Aadhaar each)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--augmentations", default=",".join(AUGMENTATIONS),
+                        help="Comma-separated subset of: " + ", ".join(AUGMENTATIONS))
+    parser.add_argument("--font", help="TrueType font for card text (default: Pillow's built-in font)")
+    args = parser.parse_args()
+
+    augmentations = [name.strip() for name in args.augmentations.split(",") if name.strip()]
+    unknown = set(augmentations) - set(AUGMENTATIONS)
+    if unknown:
+        parser.error(f"unknown augmentation(s): {', '.join(sorted(unknown))}")
+    entries = build_corpus(args.out, args.count, args.seed, augmentations, args.font)
+    print(f"✅ Wrote {len(entries)} labeled images to {args.out}/labels.jsonl")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Per-document OCR profiles.
+
+A profile holds easyocr options for one document type (detection: canvas
+size, magnification and text thresholds; recognition: decoder, beam width,
+batch size, allowlist) plus per-field overrides used when a single box is
+re-read, e.g. the PAN number with an A-Z/0-9 allowlist and beam search.
+
+Profiles load from OCR_PROFILES_PATH (default: ocr_profiles.json next to
+this module) and are merged over the built-in defaults, so settings can be
+tuned without code changes. A "default" entry applies to every document.
+"""
+import json
+import os
+
+OCR_PROFILES_PATH = os.getenv(
+    'OCR_PROFILES_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ocr_profiles.json')
+)
+
+DETECTION_OPTIONS = {"canvas_size", "mag_ratio", "text_threshold", "low_text", "link_threshold", "min_size"}
+RECOGNITION_OPTIONS = {
+    "allowlist", "blocklist", "decoder", "beamWidth", "batch_size", "contrast_ths", "adjust_contrast"
+}
+DECODERS = {"greedy", "beamsearch", "wordbeamsearch"}
+
+# Used when no profile file is present: field allowlists only, easyocr defaults otherwise
+BUILTIN_PROFILES = {
+    "pan": {"fields": {"pan_number": {"allowlist": "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"}}},
+    "aadhaar": {"fields": {"aadhaar_number": {"allowlist": "0123456789 "}}},
+}
+
+
+class InvalidOcrProfile(ValueError):
+    """Raised for unknown options or bad values in a profile file"""
+
+
+def _validate_options(options, where, allowed):
+    unknown = set(options) - allowed
+    if unknown:
+        raise InvalidOcrProfile(f"{where}: unknown option(s) {', '.join(sorted(unknown))}")
+    if "decoder" in options and options["decoder"] not in DECODERS:
+        raise InvalidOcrProfile(f"{where}: decoder must be one of {', '.join(sorted(DECODERS))}")
+    for key in ("beamWidth", "batch_size", "canvas_size", "min_size"):
+        if key in options and (not isinstance(options[key], int) or options[key] < 1):
+            raise InvalidOcrProfile(f"{where}: {key} must be a positive integer")
+
+
+def validate_profiles(profiles):
+    for document, profile in profiles.items():
+        fields = profile.get("fields", {})
+        options = {k: v for k, v in profile.items() if k != "fields"}
+        _validate_options(options, document, DETECTION_OPTIONS | RECOGNITION_OPTIONS)
+        for field, field_options in fields.items():
+            _validate_options(field_options, f"{document}.{field}", RECOGNITION_OPTIONS)
+    return profiles
+
+
+def load_profiles(path=OCR_PROFILES_PATH):
+    """Built-in profiles with the profile file (if any) merged over them"""
+    profiles = {document: dict(profile, fields=dict(profile.get("fields", {})))
+                for document, profile in BUILTIN_PROFILES.items()}
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            loaded = validate_profiles(json.load(f))
+        for document, profile in loaded.items():
+            merged = profiles.setdefault(document, {"fields": {}})
+            merged.update({k: v for k, v in profile.items() if k != "fields"})
+            for field, options in profile.get("fields", {}).items():
+                merged["fields"][field] = dict(merged["fields"].get(field, {}), **options)
+    return profiles
+
+
+profiles = load_profiles()
+
+
+def reload_profiles(path=OCR_PROFILES_PATH):
+    global profiles
+    profiles = load_profiles(path)
+    return profiles
+
+
+def readtext_options(document=None):
+    """Detection + recognition options for a full-page read of `document`"""
+    options = {k: v for k, v in profiles.get("default", {}).items() if k != "fields"}
+    if document:
+        options.update({k: v for k, v in profiles.get(document, {}).items() if k != "fields"})
+    return options
+
+
+def field_options(document, field):
+    """Recognition options for re-reading a single box that should hold `field`"""
+    options = {k: v for k, v in readtext_options(document).items() if k in RECOGNITION_OPTIONS}
+    options.update(profiles.get(document, {}).get("fields", {}).get(field, {}))
+    return options
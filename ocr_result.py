@@ -0,0 +1,81 @@
+"""
+Compact, array-backed OCR result.
+Keeps the box, text and confidence of every recognized line (instead of
+only the strings) plus the greyscale image they came from, so extractors
+can re-recognize individual low-confidence boxes.
+"""
+import numpy as np
+
+
+class OcrResult:
+    __slots__ = ("boxes", "texts", "confidences", "image", "scripts", "source", "scale")
+
+    def __init__(self, boxes, texts, confidences, image=None):
+        self.boxes = boxes
+        self.texts = texts
+        self.confidences = confidences
+        self.image = image
+        # Full-resolution image when `image` is a downscaled copy (scale = image / source)
+        self.source = None
+        self.scale = 1.0
+        # Script each line was recognized in ('latin' unless re-read by a script reader)
+        self.scripts = ['latin'] * len(texts)
+
+    @classmethod
+    def from_readtext(cls, results, image=None):
+        """Build from easyocr readtext(detail=1) output, dropping empty lines"""
+        kept = [(box, text.strip(), conf) for box, text, conf in results if text.strip()]
+        if not kept:
+            return cls(np.zeros((0, 4, 2), np.float32), [], np.zeros(0, np.float32), image)
+        boxes, texts, confidences = zip(*kept)
+        return cls(
+            np.asarray(boxes, dtype=np.float32).reshape(-1, 4, 2),
+            list(texts),
+            np.asarray(confidences, dtype=np.float32),
+            image
+        )
+
+    @property
+    def lines(self):
+        """Recognized strings in reading order (what the extractors consume)"""
+        return list(self.texts)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def low_confidence(self, threshold):
+        """Indices of lines recognized below `threshold`"""
+        return np.flatnonzero(self.confidences < threshold)
+
+    def bounds(self, index, margin=0.15):
+        """Axis-aligned (x0, y0, x1, y1) of a box, padded by `margin` of its height"""
+        box = self.boxes[index]
+        x0, y0 = box.min(axis=0)
+        x1, y1 = box.max(axis=0)
+        pad = (y1 - y0) * margin
+        height, width = self.image.shape[:2]
+        return (
+            int(max(0, x0 - pad)), int(max(0, y0 - pad)),
+            int(min(width, x1 + pad)), int(min(height, y1 + pad))
+        )
+
+    def crop(self, index, margin=0.15):
+        """
+        Pixels of a box, from the full-resolution source when OCR ran on a
+        downscaled copy. Returns (array, scale of the array relative to `image`).
+        """
+        x0, y0, x1, y1 = self.bounds(index, margin)
+        if self.source is None:
+            return self.image[y0:y1, x0:x1], 1.0
+        factor = 1.0 / self.scale
+        height, width = self.source.shape[:2]
+        return self.source[
+            int(y0 * factor):min(height, int(round(y1 * factor))),
+            int(x0 * factor):min(width, int(round(x1 * factor)))
+        ], factor
+
+    def replace(self, index, text, confidence, script=None):
+        self.texts[index] = text
+        self.confidences[index] = confidence
+        if script:
+            self.scripts[index] = script
@@ -0,0 +1,336 @@
+"""
+Shared OCR inference service.
+
+A single process owns the easyocr models and serves OCR over a Unix socket,
+so web workers no longer load their own copy of the torch models. Text
+detection runs per image; recognition crops from concurrent requests are
+collected into dynamic batches (bounded by size and a max wait) and run
+through the recognizer together.
+
+Run the server:
+    python ocr_service.py --socket /tmp/kyc-ocr.sock
+
+Point the web workers at it:
+    OCR_SERVICE_SOCKET=/tmp/kyc-ocr.sock uvicorn main:app
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ocr_profiles import DETECTION_OPTIONS, RECOGNITION_OPTIONS
+
+OCR_SERVICE_SOCKET = os.getenv('OCR_SERVICE_SOCKET')
+OCR_SERVICE_TIMEOUT = float(os.getenv('OCR_SERVICE_TIMEOUT', '60'))
+OCR_BATCH_MAX_CROPS = int(os.getenv('OCR_BATCH_MAX_CROPS', '64'))
+OCR_BATCH_MAX_WAIT_MS = float(os.getenv('OCR_BATCH_MAX_WAIT_MS', '15'))
+
+_HEADER = struct.Struct('>II')
+
+
+class OcrServiceUnavailable(Exception):
+    """Raised when the OCR service cannot be reached or fails a request"""
+
+
+# ---------------- WIRE PROTOCOL ----------------
+# Each frame: 8-byte prefix (header length, payload length), JSON header, raw payload
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("OCR service connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def send_frame(sock, header, payload=b""):
+    data = json.dumps(header).encode()
+    sock.sendall(_HEADER.pack(len(data), len(payload)) + data + payload)
+
+
+def recv_frame(sock):
+    header_len, payload_len = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    header = json.loads(_recv_exact(sock, header_len))
+    payload = _recv_exact(sock, payload_len) if payload_len else b""
+    return header, payload
+
+
+async def _read_frame(reader):
+    header_len, payload_len = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    header = json.loads(await reader.readexactly(header_len))
+    payload = await reader.readexactly(payload_len) if payload_len else b""
+    return header, payload
+
+
+def _write_frame(writer, header, payload=b""):
+    data = json.dumps(header).encode()
+    writer.write(_HEADER.pack(len(data), len(payload)) + data + payload)
+
+
+def _to_wire(results):
+    """Convert easyocr results (numpy-typed boxes/confidences) to JSON lists"""
+    return [
+        [[[float(x), float(y)] for x, y in box], text, float(conf)]
+        for box, text, conf in results
+    ]
+
+
+# ---------------- CLIENT ----------------
+
+def _request(header, grey, socket_path=None, timeout=None):
+    grey = np.ascontiguousarray(grey, dtype=np.uint8)
+    header = dict(header, shape=list(grey.shape))
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout or OCR_SERVICE_TIMEOUT)
+            sock.connect(socket_path or OCR_SERVICE_SOCKET)
+            send_frame(sock, header, grey.tobytes())
+            response, _ = recv_frame(sock)
+    except (OSError, ConnectionError, ValueError) as e:
+        raise OcrServiceUnavailable(f"OCR service unreachable: {e}") from e
+
+    if not response.get("ok"):
+        raise OcrServiceUnavailable(response.get("error", "OCR service error"))
+    return [(box, text, conf) for box, text, conf in response["results"]]
+
+
+def remote_readtext(grey, options=None, socket_path=None, timeout=None):
+    """
+    Run OCR on a greyscale uint8 array through the shared service, with
+    easyocr detection/recognition options from an OCR profile.
+    Returns [(box, text, confidence), ...] like reader.readtext(detail=1).
+    """
+    return _request({"op": "readtext", "options": options or {}}, grey, socket_path, timeout)
+
+
+def remote_recognize(grey, options=None, languages=None, socket_path=None, timeout=None):
+    """
+    Recognize a single pre-cropped text region (no detection) through the service,
+    with the script reader for `languages` when given
+    """
+    header = {"op": "recognize", "options": options or {}, "languages": list(languages) if languages else None}
+    return _request(header, grey, socket_path, timeout)
+
+
+# ---------------- SERVER ----------------
+
+class _PendingRecognition:
+    __slots__ = ("image_list", "max_width", "options", "future")
+
+    def __init__(self, image_list, max_width, options, future):
+        self.image_list = image_list
+        self.max_width = max_width
+        self.options = options
+        self.future = future
+
+
+class RecognitionBatcher:
+    """Collects recognition crops from concurrent requests into shared batches"""
+
+    def __init__(self, reader, executor, max_crops=OCR_BATCH_MAX_CROPS,
+                 max_wait_ms=OCR_BATCH_MAX_WAIT_MS):
+        self.reader = reader
+        self.executor = executor
+        self.max_crops = max_crops
+        self.max_wait = max_wait_ms / 1000.0
+        # Created by start() inside the running loop: on Python 3.9 a queue binds to
+        # the loop that exists at construction, which is not the one asyncio.run starts
+        self.queue = None
+        self.task = None
+        self.ignore_char = ''.join(set(reader.character) - set(reader.lang_char))
+        self.batches = 0
+        self.crops = 0
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.task = asyncio.get_running_loop().create_task(self.run())
+        self.task.add_done_callback(self._stopped)
+        return self.task
+
+    @staticmethod
+    def _stopped(task):
+        if task.cancelled():
+            return
+        error = task.exception()
+        print(f"❌ OCR recognition batcher stopped: {error!r}", flush=True)
+
+    async def recognize(self, image_list, max_width, options=None):
+        if not image_list:
+            return []
+        if self.task is None or self.task.done():
+            raise RuntimeError("Recognition batcher is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put(_PendingRecognition(image_list, max_width, options or {}, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            crops = len(batch[0].image_list)
+            flush_at = loop.time() + self.max_wait
+            while crops < self.max_crops:
+                timeout = flush_at - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                crops += len(item.image_list)
+
+            # Requests with different recognition options (decoder, allowlist...) run in separate batches
+            groups = {}
+            for item in batch:
+                groups.setdefault(json.dumps(item.options, sort_keys=True), []).append(item)
+            for group in groups.values():
+                await self._run_group(loop, group)
+            self.crops += crops
+
+    async def _run_group(self, loop, group):
+        try:
+            results = await loop.run_in_executor(self.executor, self._recognize_batch, group)
+        except Exception as e:
+            for item in group:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        # Split the flat result list back into per-request slices
+        offset = 0
+        for item in group:
+            count = len(item.image_list)
+            if not item.future.done():
+                item.future.set_result(results[offset:offset + count])
+            offset += count
+        self.batches += 1
+
+    def _recognize_batch(self, batch):
+        from easyocr.easyocr import imgH
+        from easyocr.recognition import get_text
+
+        image_list = [crop for item in batch for crop in item.image_list]
+        max_width = max(item.max_width for item in batch)
+        options = batch[0].options
+        reader = self.reader
+        if options.get("allowlist"):
+            ignore_char = ''.join(set(reader.character) - set(options["allowlist"]))
+        elif options.get("blocklist"):
+            ignore_char = ''.join(set(options["blocklist"]))
+        else:
+            ignore_char = self.ignore_char
+        return get_text(
+            reader.character, imgH, int(max_width), reader.recognizer, reader.converter,
+            image_list, ignore_char, options.get("decoder", 'greedy'), options.get("beamWidth", 5),
+            len(image_list), options.get("contrast_ths", 0.1), options.get("adjust_contrast", 0.5),
+            0.003, 0, reader.device
+        )
+
+
+class OcrServer:
+    def __init__(self, socket_path, max_crops=OCR_BATCH_MAX_CROPS, max_wait_ms=OCR_BATCH_MAX_WAIT_MS):
+        import easyocr
+
+        self.socket_path = socket_path
+        print("🔧 Loading EasyOCR models for the shared OCR service...", flush=True)
+        self.reader = easyocr.Reader(['en'], gpu=False)
+        # One model thread: torch already parallelizes inside each call
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr-model")
+        self.batcher = RecognitionBatcher(self.reader, self.executor, max_crops, max_wait_ms)
+
+    def _detect(self, grey, options):
+        from easyocr.easyocr import imgH
+        from easyocr.utils import get_image_list
+
+        detection = {k: v for k, v in options.items() if k in DETECTION_OPTIONS}
+        horizontal_list, free_list = self.reader.detect(grey, **detection)
+        return get_image_list(horizontal_list[0], free_list[0], grey, model_height=imgH)
+
+    def _recognize_region(self, grey, options, languages=None):
+        from multilingual import script_readers
+
+        reader = script_readers.get(languages) if languages else self.reader
+        return reader.recognize(grey, detail=1, **options)
+
+    async def handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            header, payload = await _read_frame(reader)
+            if header.get("op") == "stats":
+                _write_frame(writer, {
+                    "ok": True,
+                    "batches": self.batcher.batches,
+                    "crops": self.batcher.crops,
+                    "queued": self.batcher.queue.qsize() if self.batcher.queue else 0
+                })
+                return
+            started = time.perf_counter()
+            grey = np.frombuffer(payload, dtype=np.uint8).reshape(header["shape"])
+            if header.get("op") == "recognize":
+                results = await loop.run_in_executor(
+                    self.executor, self._recognize_region, grey, header.get("options") or {},
+                    header.get("languages")
+                )
+            else:
+                options = header.get("options") or {}
+                image_list, max_width = await loop.run_in_executor(self.executor, self._detect, grey, options)
+                # The batcher sizes batches itself, so batch_size does not apply here
+                recognition = {k: v for k, v in options.items() if k in RECOGNITION_OPTIONS and k != "batch_size"}
+                results = await self.batcher.recognize(image_list, max_width, recognition)
+            _write_frame(writer, {
+                "ok": True,
+                "results": _to_wire(results),
+                "seconds": time.perf_counter() - started
+            })
+        except asyncio.IncompleteReadError:
+            pass
+        except Exception as e:
+            print(f"❌ OCR service request failed: {e}", flush=True)
+            _write_frame(writer, {"ok": False, "error": str(e)})
+        finally:
+            try:
+                await writer.drain()
+            finally:
+                writer.close()
+
+    async def serve(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self.handle, path=self.socket_path)
+        self.batcher.start()
+        print(f"✅ OCR service listening on {self.socket_path}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared OCR inference service")
+    parser.add_argument("--socket", default=OCR_SERVICE_SOCKET or "/tmp/kyc-ocr.sock")
+    parser.add_argument("--max-batch", type=int, default=OCR_BATCH_MAX_CROPS,
+                        help="Maximum recognition crops per batch")
+    parser.add_argument("--max-wait-ms", type=float, default=OCR_BATCH_MAX_WAIT_MS,
+                        help="Maximum time to wait for more crops before running a batch")
+    args = parser.parse_args()
+
+    server = OcrServer(args.socket, args.max_batch, args.max_wait_ms)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,164 @@
+import os
 import re
+import threading
+import time
 import numpy as np
 from PIL import Image
-import easyocr
 from datetime import datetime
+import metrics
+from ocr_service import OCR_SERVICE_SOCKET, remote_readtext, remote_recognize
+from ocr_result import OcrResult
+from aadhaar_qr import read_aadhaar_qr
+from orientation import auto_orient, orient_upright
+import ocr_profiles
+from multilingual import OCR_SCRIPT_ROUTING, SCRIPT_LANGUAGES, detect_script, script_readers
 
-reader = easyocr.Reader(['en'], gpu=False)
+# Lines below this confidence that could hold a missing field get re-recognized
+OCR_RECHECK_CONFIDENCE = float(os.getenv('OCR_RECHECK_CONFIDENCE', '0.6'))
+OCR_RECHECK_MAG = float(os.getenv('OCR_RECHECK_MAG', '2.0'))
 
-def preprocess_image(pil_img):
+
+# Greyscale gain applied before OCR (tune with sweep_ocr.py)
+OCR_CONTRAST = float(os.getenv('OCR_CONTRAST', '1.3'))
+
+# Coarse-to-fine OCR: try these long-edge sizes (pixels) before full resolution
+OCR_ADAPTIVE = os.getenv('OCR_ADAPTIVE', 'on').lower() not in ('0', 'off', 'false')
+OCR_ADAPTIVE_LEVELS = sorted(int(edge) for edge in os.getenv('OCR_ADAPTIVE_LEVELS', '960').split(',') if edge.strip())
+
+# Try the Aadhaar QR code before full-page OCR
+AADHAAR_QR_FAST_PATH = os.getenv('AADHAAR_QR_FAST_PATH', 'on').lower() not in ('0', 'off', 'false')
+
+reader = None
+_reader_lock = threading.Lock()
+
+def get_reader():
+    """Load the local EasyOCR reader once per process"""
+    global reader
+    if reader is None:
+        with _reader_lock:
+            if reader is None:
+                import easyocr
+                reader = easyocr.Reader(['en'], gpu=False)
+    return reader
+
+# Web workers using the shared OCR service never load the torch models
+if not OCR_SERVICE_SOCKET:
+    get_reader()
+
+def preprocess_image(pil_img, contrast=None):
     arr = np.array(pil_img.convert('L'))
-    arr = np.clip(arr * 1.3, 0, 255).astype(np.uint8)
+    arr = np.clip(arr * (OCR_CONTRAST if contrast is None else contrast), 0, 255).astype(np.uint8)
     return Image.fromarray(arr)
 
-def ocr_text(pil_img):
-    processed = preprocess_image(pil_img)
-    results = reader.readtext(np.array(processed), detail=1)
-    return [r[1].strip() for r in results if r[1].strip()]
+def readtext(grey, options=None):
+    """
+    Run detection + recognition locally or through the shared OCR service,
+    with easyocr options from an OCR profile
+    """
+    options = options or {}
+    if OCR_SERVICE_SOCKET:
+        return remote_readtext(grey, options)
+    return get_reader().readtext(grey, detail=1, **options)
+
+def recognize_region(grey, options=None, languages=None):
+    """
+    Recognize one cropped text region (no detection) with recognition options
+    (allowlist, decoder...), or with the script reader for `languages`
+    """
+    options = options or {}
+    if OCR_SERVICE_SOCKET:
+        return remote_recognize(grey, options, languages)
+    reader = script_readers.get(languages) if languages else get_reader()
+    return reader.recognize(grey, detail=1, **options)
+
+def route_scripts(result):
+    """
+    Re-read the regions printed in a non-Latin script with the reader for that
+    script (loaded on first use). Returns the number of regions re-read.
+    """
+    routed = 0
+    for index in range(len(result)):
+        crop, _ = result.crop(index, margin=0.0)
+        if crop.size == 0:
+            continue
+        script = detect_script(crop)
+        languages = SCRIPT_LANGUAGES.get(script)
+        if not languages:
+            continue
+        readings = recognize_region(crop, languages=languages)
+        metrics.inc(f"ocr.script_regions.{script}")
+        text = " ".join(r[1].strip() for r in readings if r[1].strip())
+        if text:
+            result.replace(index, text, min(float(r[2]) for r in readings), script)
+            routed += 1
+    return routed
+
+def prepare_image(pil_img):
+    """Orient upright and preprocess once; returns the full-resolution greyscale array"""
+    # Rotate upright once so recognition runs a single pass per image
+    pil_img, angle = auto_orient(pil_img)
+    if angle:
+        metrics.inc(f"orientation.rotated_{angle}")
+    # Geometry only fixes the axis; a few line re-reads settle up/down before OCR
+    grey, turned = orient_upright(np.array(preprocess_image(pil_img)), recognize_region)
+    if turned:
+        metrics.inc("orientation.rotated_180_by_confidence")
+    return grey
+
+def ocr_grey(grey, max_edge=None, document=None):
+    """
+    OCR a prepared greyscale array with the profile for `document`, downscaled
+    first so its long edge is at most `max_edge`. Box re-reads still crop from
+    the full-resolution array.
+    """
+    image = grey
+    scale = 1.0
+    if max_edge and max(grey.shape[:2]) > max_edge:
+        scale = max_edge / max(grey.shape[:2])
+        height, width = grey.shape[:2]
+        small = Image.fromarray(grey).resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.BOX)
+        image = np.array(small)
+    result = OcrResult.from_readtext(readtext(image, ocr_profiles.readtext_options(document)), image)
+    if scale != 1.0:
+        result.source, result.scale = grey, scale
+    if OCR_SCRIPT_ROUTING:
+        route_scripts(result)
+    return result
+
+def ocr_result(pil_img, document=None):
+    """Run OCR and keep boxes, text and confidence for every line"""
+    return ocr_grey(prepare_image(pil_img), document=document)
+
+def ocr_text(pil_img, document=None):
+    return ocr_result(pil_img, document).lines
+
+def rerecognize(result, indices, options=None, mag=OCR_RECHECK_MAG):
+    """
+    Re-read only the given boxes at higher magnification (with recognition
+    options such as a field's allowlist and decoder), keeping the new reading
+    when it is more confident.
+    Returns the number of boxes that improved.
+    """
+    improved = 0
+    for index in indices:
+        crop, factor = result.crop(index)
+        if crop.size == 0:
+            continue
+        crop = Image.fromarray(crop)
+        # Boxes found on a downscaled pass are re-read from full-resolution pixels
+        zoom = max(1.0, mag / factor)
+        if zoom > 1.0:
+            crop = crop.resize((int(crop.width * zoom), int(crop.height * zoom)), Image.BICUBIC)
+        readings = recognize_region(np.array(crop), options)
+        metrics.inc("ocr.rechecked_boxes")
+        if not readings:
+            continue
+        text = " ".join(r[1].strip() for r in readings if r[1].strip())
+        confidence = min(float(r[2]) for r in readings)
+        if text and confidence > result.confidences[index]:
+            result.replace(index, text, confidence, "latin")
+            improved += 1
+    return improved
 
 def extract_pan_details(lines):
     """Extract PAN details including name, father's name, and DOB"""
@@ -104,3 +248,147 @@ def extract_aadhaar_details(lines):
         "gender": gender,
         "vid": None
     }
+
+def refine_pan_details(result, details):
+    """Re-read low-confidence boxes that could hold a missing PAN number"""
+    if details.get("pan_number"):
+        return details
+    candidates = [
+        i for i in result.low_confidence(OCR_RECHECK_CONFIDENCE)
+        if 8 <= len(re.sub(r'[^A-Za-z0-9]', '', result.texts[i])) <= 12
+    ]
+    if candidates and rerecognize(result, candidates, ocr_profiles.field_options("pan", "pan_number")):
+        details = extract_pan_details(result.lines)
+        if details.get("pan_number"):
+            metrics.inc("ocr.recheck_recovered.pan_number")
+    return details
+
+def refine_aadhaar_details(result, details):
+    """Re-read low-confidence, digit-heavy boxes when no 12-digit number was found"""
+    if details.get("aadhaar_number"):
+        return details
+    candidates = [
+        i for i in result.low_confidence(OCR_RECHECK_CONFIDENCE)
+        if len(re.findall(r'[0-9]', result.texts[i])) >= 4
+    ]
+    if candidates and rerecognize(result, candidates, ocr_profiles.field_options("aadhaar", "aadhaar_number")):
+        details = extract_aadhaar_details(result.lines)
+        if details.get("aadhaar_number"):
+            metrics.inc("ocr.recheck_recovered.aadhaar_number")
+    return details
+
+def read_adaptive(pil_img, extract, refine, required, document):
+    """
+    Coarse-to-fine OCR: read a downscaled copy first, re-read weak boxes from
+    full-resolution pixels, and only run OCR at the next level when a field
+    in `required` is still missing. Returns (result, details) of the last level.
+    """
+    grey = prepare_image(pil_img)
+    levels = [edge for edge in OCR_ADAPTIVE_LEVELS if edge < max(grey.shape[:2])] if OCR_ADAPTIVE else []
+    for edge in levels + [None]:
+        level = str(edge) if edge else "full"
+        result = ocr_grey(grey, edge, document)
+        details = refine(result, extract(result.lines))
+        metrics.inc(f"ocr.adaptive.{document}.{level}.attempts")
+        if all(details.get(field) for field in required):
+            metrics.inc(f"ocr.adaptive.{document}.{level}.success")
+            break
+    return result, details
+
+def read_pan(pil_img, with_result=False):
+    """
+    OCR a PAN card and extract its fields, re-reading only weak boxes if needed.
+    With `with_result`, returns (details, OcrResult).
+    """
+    result, details = read_adaptive(pil_img, extract_pan_details, refine_pan_details, ("pan_number", "name"), "pan")
+    return (details, result) if with_result else details
+
+def merge_qr_details(details, qr):
+    """Fill Aadhaar fields from a QR payload that lacks the full number (Secure QR)"""
+    merged = dict(details)
+    for field in ("name", "dob", "gender"):
+        if qr.get(field):
+            merged[field] = qr[field]
+    last4 = qr.get("aadhaar_last4")
+    if last4 and merged.get("aadhaar_number"):
+        merged["qr_last4_match"] = merged["aadhaar_number"].endswith(last4)
+    return merged
+
+def local_name(result, name):
+    """The non-Latin line printed just above the English name (Aadhaar prints both)"""
+    if not name or name not in result.texts:
+        return None
+    index = result.texts.index(name)
+    for previous in range(index - 1, max(-1, index - 3), -1):
+        if result.scripts[previous] != 'latin':
+            return result.texts[previous]
+    return None
+
+def read_aadhaar(pil_img, with_result=False):
+    """
+    Read an Aadhaar card: decode the QR code first and fall back to OCR
+    (re-reading only weak boxes if needed) when it has no full Aadhaar number.
+    With `with_result`, returns (details, OcrResult or None for a QR read).
+    """
+    qr = None
+    if AADHAAR_QR_FAST_PATH:
+        started = time.perf_counter()
+        qr = read_aadhaar_qr(pil_img)
+        qr_seconds = time.perf_counter() - started
+        metrics.observe("aadhaar_qr.decode_seconds", qr_seconds)
+        if qr and qr.get("aadhaar_number"):
+            metrics.inc("aadhaar_qr.hit")
+            ocr_seconds = metrics.mean("aadhaar.ocr_seconds")
+            if ocr_seconds is not None:
+                metrics.observe("aadhaar_qr.saved_seconds", max(0.0, ocr_seconds - qr_seconds))
+            return (qr, None) if with_result else qr
+        metrics.inc("aadhaar_qr.partial" if qr else "aadhaar_qr.miss")
+
+    started = time.perf_counter()
+    result, details = read_adaptive(
+        pil_img, extract_aadhaar_details, refine_aadhaar_details, ("aadhaar_number",), "aadhaar"
+    )
+    name_local = local_name(result, details.get("name"))
+    if name_local:
+        details["name_local"] = name_local
+    metrics.observe("aadhaar.ocr_seconds", time.perf_counter() - started)
+    details = merge_qr_details(details, qr) if qr else details
+    return (details, result) if with_result else details
+
+def _compact(text):
+    return re.sub(r'[^A-Za-z0-9]', '', text or '').upper()
+
+def locate_field(result, value, max_lines=3):
+    """
+    Where a field value was read: relative (x0, y0, x1, y1) bounds of the
+    line, or run of up to `max_lines` consecutive lines, whose text holds it
+    """
+    target = _compact(value)
+    if not target:
+        return None
+    height, width = result.image.shape[:2]
+    for start in range(len(result)):
+        text = ""
+        for end in range(start, min(len(result), start + max_lines)):
+            text += _compact(result.texts[end])
+            if target in text:
+                bounds = np.array([result.bounds(i) for i in range(start, end + 1)], dtype=np.float64)
+                x0, y0 = bounds[:, :2].min(axis=0)
+                x1, y1 = bounds[:, 2:].max(axis=0)
+                return (float(x0 / width), float(y0 / height), float(x1 / width), float(y1 / height))
+    return None
+
+def confirm_field(pil_img, document, field, region, expected):
+    """
+    Re-read only `region` (from locate_field on an earlier, near-identical
+    image) with the field's recognition options; True when it still reads
+    `expected`. Costs one box recognition instead of a full OCR pass.
+    """
+    grey = prepare_image(pil_img)
+    height, width = grey.shape[:2]
+    x0, y0, x1, y1 = region
+    crop = grey[int(y0 * height):int(np.ceil(y1 * height)), int(x0 * width):int(np.ceil(x1 * width))]
+    if crop.size == 0:
+        return False
+    readings = recognize_region(np.ascontiguousarray(crop), ocr_profiles.field_options(document, field))
+    return _compact(expected) in _compact("".join(reading[1] for reading in readings))
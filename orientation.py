@@ -0,0 +1,205 @@
+"""
+Cheap orientation correction before recognition.
+Applies the EXIF transpose, then turns sideways text horizontal from
+text-line geometry so OCR runs once per image whatever the capture
+orientation.
+
+Geometry only fixes the axis: a card turned 90° and one turned 270° both
+come out horizontal, one of them upside down, as does a 180° capture.
+Up/down is decided before the full OCR pass by re-reading a few of the
+widest text lines as they are and turned 180° and keeping the more
+confident reading (ORIENTATION_FLIP=confidence, see orient_upright).
+The baseline vote (ORIENTATION_FLIP=baseline) needs no recognizer but is
+easily fooled by card artwork and all-caps lines, so it only applies when
+it is decisive.
+"""
+import os
+import numpy as np
+from PIL import Image, ImageOps
+
+from imaging import otsu_threshold
+
+ORIENTATION_AUTO = os.getenv('ORIENTATION_AUTO', 'on').lower() not in ('0', 'off', 'false')
+# How much stronger the vertical line structure must be before turning the image
+ORIENTATION_AXIS_RATIO = float(os.getenv('ORIENTATION_AXIS_RATIO', '1.25'))
+# Minimum baseline asymmetry (fraction of line height) for a text line to vote on up/down
+ORIENTATION_FLIP_MARGIN = float(os.getenv('ORIENTATION_FLIP_MARGIN', '0.04'))
+# off | baseline (decisive text-line votes) | confidence (re-read the widest boxes turned 180°)
+ORIENTATION_FLIP = os.getenv('ORIENTATION_FLIP', 'confidence').lower()
+# Baseline mode: voting lines needed and share of the vote weight that must agree
+ORIENTATION_FLIP_MIN_LINES = int(os.getenv('ORIENTATION_FLIP_MIN_LINES', '3'))
+ORIENTATION_FLIP_AGREEMENT = float(os.getenv('ORIENTATION_FLIP_AGREEMENT', '0.8'))
+# Confidence mode: text lines compared and how much more confident the turned reading must be
+ORIENTATION_FLIP_BOXES = int(os.getenv('ORIENTATION_FLIP_BOXES', '3'))
+ORIENTATION_FLIP_CONFIDENCE = float(os.getenv('ORIENTATION_FLIP_CONFIDENCE', '0.2'))
+
+ANALYSIS_LONG_EDGE = 600
+
+_TRANSPOSE = {
+    90: Image.ROTATE_90,
+    180: Image.ROTATE_180,
+    270: Image.ROTATE_270,
+}
+
+
+def _ink_mask(pil_img):
+    """Downscaled boolean mask of dark (text) pixels using Otsu's threshold"""
+    grey = pil_img.convert('L')
+    grey.thumbnail((ANALYSIS_LONG_EDGE, ANALYSIS_LONG_EDGE))
+    arr = np.asarray(grey)
+    threshold = otsu_threshold(arr)
+    if threshold is None:
+        return np.zeros(arr.shape, dtype=bool)
+    return arr <= threshold
+
+
+def _line_structure(profile):
+    """
+    How strongly a projection profile alternates between text lines and gaps
+    (coefficient of variation). Across text lines it swings between dense rows
+    and empty gaps; along them, many lines average out into a flatter profile.
+    """
+    mean = profile.mean()
+    if mean == 0:
+        return 0.0
+    return float(profile.std() / mean)
+
+
+def _upside_down_vote(mask):
+    """
+    Vote on whether text lines are upside down from the average position of
+    ink inside each line, relative to the line centre (positive = ink sits low).
+    Latin text sits on a shared baseline with sparser ascenders above, so
+    upright lines lean positive and upside-down lines negative.
+    Returns True/False, or None unless enough lines agree decisively.
+    """
+    rows = mask.mean(axis=1)
+    in_line = rows > max(rows.mean() * 0.5, 1e-6)
+    offsets, weights = [], []
+    start = None
+    for y, flag in enumerate(np.append(in_line, False)):
+        if flag and start is None:
+            start = y
+        elif not flag and start is not None:
+            band = rows[start:y]
+            if len(band) >= 3:
+                positions = np.linspace(-0.5, 0.5, len(band))
+                offset = float((band * positions).sum() / band.sum())
+                # All-caps and digit lines are nearly symmetric; only mixed-case lines vote
+                if abs(offset) >= ORIENTATION_FLIP_MARGIN:
+                    offsets.append(offset)
+                    weights.append(float(band.sum()))
+            start = None
+    if len(weights) < ORIENTATION_FLIP_MIN_LINES:
+        return None
+    weights = np.asarray(weights)
+    down = weights[np.asarray(offsets) < 0].sum() / weights.sum()
+    if down >= ORIENTATION_FLIP_AGREEMENT:
+        return True
+    if down <= 1 - ORIENTATION_FLIP_AGREEMENT:
+        return False
+    return None
+
+
+def estimate_rotation(pil_img):
+    """Return the counter-clockwise rotation (0/90/180/270) that makes text upright"""
+    mask = _ink_mask(pil_img)
+    if not mask.any():
+        return 0
+    ys, xs = np.nonzero(mask)
+    mask = mask[ys.min():ys.max() + 1, xs.min():xs.max() + 1]
+
+    horizontal = _line_structure(mask.mean(axis=1))
+    vertical = _line_structure(mask.mean(axis=0))
+
+    angle = 0
+    if vertical > horizontal * ORIENTATION_AXIS_RATIO:
+        # Text runs top-to-bottom: turn it horizontal, then decide up/down below
+        angle = 90
+        mask = np.rot90(mask)
+
+    if ORIENTATION_FLIP == 'baseline' and _upside_down_vote(mask):
+        angle = (angle + 180) % 360
+    return angle
+
+
+def _confidence(readings):
+    return float(np.mean([float(reading[2]) for reading in readings])) if readings else 0.0
+
+
+def _runs(flags):
+    """(start, end) of each run of True values"""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], flags.astype(np.int8), [0]))))
+    return list(zip(edges[::2], edges[1::2]))
+
+
+def line_crops(grey, count=ORIENTATION_FLIP_BOXES):
+    """
+    Crops of the `count` widest text lines of a horizontal greyscale page,
+    found from ink projections without running detection. Line bands are
+    split at gaps wider than the line height so artwork beside the text
+    does not stretch a line.
+    """
+    threshold = otsu_threshold(grey)
+    if threshold is None:
+        return []
+    mask = grey <= threshold
+    rows = mask.mean(axis=1)
+    lines = []
+    for top, bottom in _runs(rows > max(rows.mean() * 0.5, 1e-6)):
+        height = bottom - top
+        if height < 8:
+            continue
+        ink = mask[top:bottom].any(axis=0)
+        # Gaps between letters and words are narrower than the line is tall
+        gaps = [(start, end) for start, end in _runs(~ink) if end - start > height]
+        left = 0
+        for start, end in gaps + [(len(ink), len(ink))]:
+            segment = np.flatnonzero(ink[left:start])
+            if len(segment):
+                x0, x1 = left + segment[0], left + segment[-1] + 1
+                if x1 - x0 >= 3 * height:
+                    lines.append((x1 - x0, top, bottom, x0, x1))
+            left = end
+    crops = []
+    for _, top, bottom, x0, x1 in sorted(lines, reverse=True)[:count]:
+        pad = max(2, (bottom - top) // 4)
+        crop = grey[max(0, top - pad):bottom + pad, max(0, x0 - pad):x1 + pad]
+        crops.append(np.ascontiguousarray(crop))
+    return crops
+
+
+def upside_down(crops, recognize):
+    """
+    Re-read text-line crops as they are and turned 180°; True when the turned
+    readings are clearly more confident.
+    `recognize(crop)` returns easyocr (box, text, confidence) readings.
+    """
+    if not crops:
+        return False
+    upright = [_confidence(recognize(crop)) for crop in crops]
+    turned = [_confidence(recognize(np.ascontiguousarray(crop[::-1, ::-1]))) for crop in crops]
+    return float(np.mean(turned)) - float(np.mean(upright)) >= ORIENTATION_FLIP_CONFIDENCE
+
+
+def orient_upright(grey, recognize):
+    """
+    With ORIENTATION_FLIP=confidence, turn a horizontal greyscale page 180°
+    when its text lines read better that way. Returns (grey, turned).
+    """
+    if not ORIENTATION_AUTO or ORIENTATION_FLIP != 'confidence':
+        return grey, False
+    if not upside_down(line_crops(grey), recognize):
+        return grey, False
+    return np.ascontiguousarray(grey[::-1, ::-1]), True
+
+
+def auto_orient(pil_img):
+    """Apply EXIF orientation and rotate the image upright. Returns (image, angle)"""
+    pil_img = ImageOps.exif_transpose(pil_img)
+    if not ORIENTATION_AUTO:
+        return pil_img, 0
+    angle = estimate_rotation(pil_img)
+    if angle:
+        pil_img = pil_img.transpose(_TRANSPOSE[angle])
+    return pil_img, angle
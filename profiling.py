@@ -0,0 +1,182 @@
+"""
+On-demand request profiling for the upload pipeline.
+
+When switched on by an admin, a sampled fraction of uploads is profiled with
+a lightweight stack sampler (collapsed stacks, ready for flamegraph.pl or
+speedscope) and, optionally, tracemalloc allocation tracking including the
+peak traced memory of each stage (dominated by decoded image arrays).
+When switched off, the only cost per request is a boolean check.
+"""
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+
+import metrics
+
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', '0.005'))
+PROFILE_TRACEMALLOC_FRAMES = int(os.getenv('PROFILE_TRACEMALLOC_FRAMES', '15'))
+
+
+def _collapse(frame):
+    """Render a frame chain as a root-first 'file:function' collapsed stack"""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's stack at a fixed interval until stopped"""
+
+    def __init__(self, thread_id, label, interval, stacks, lock):
+        super().__init__(name=f"profiler-{label}", daemon=True)
+        self.thread_id = thread_id
+        self.label = label
+        self.interval = interval
+        self.stacks = stacks
+        self.lock = lock
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = f"{self.label};{_collapse(frame)}"
+            with self.lock:
+                self.stacks[stack] += 1
+
+
+class RequestProfiler:
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = 0.0
+        self.trace_memory = False
+        self.interval = PROFILE_SAMPLE_INTERVAL
+        self.stacks = Counter()
+        self.allocations = []
+        self.peaks = deque(maxlen=200)
+        self.profiled_requests = 0
+        self._lock = threading.Lock()
+        self._memory_lock = threading.Lock()
+
+    def configure(self, enabled, sample_rate=None, trace_memory=None, interval=None):
+        if sample_rate is not None:
+            self.sample_rate = max(0.0, min(1.0, sample_rate))
+        if interval is not None:
+            self.interval = max(0.001, interval)
+        if trace_memory is not None:
+            self.trace_memory = trace_memory
+        self.enabled = enabled
+
+        if self.enabled and self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+        elif (not self.enabled or not self.trace_memory) and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return self.status()
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.allocations = []
+            self.peaks.clear()
+            self.profiled_requests = 0
+
+    def status(self):
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "trace_memory": self.trace_memory,
+            "interval_seconds": self.interval,
+            "profiled_requests": self.profiled_requests,
+            "stack_samples": sum(self.stacks.values()),
+            "recent_peaks": list(self.peaks)[-20:],
+        }
+
+    def should_sample(self):
+        """Decide per request whether to profile it (cheap when disabled)"""
+        if not self.enabled:
+            return False
+        if random.random() >= self.sample_rate:
+            return False
+        self.profiled_requests += 1
+        metrics.inc("profiling.sampled_requests")
+        return True
+
+    def wrap(self, fn, label):
+        """Return `fn` instrumented to profile one call under `label`"""
+        def profiled(*args, **kwargs):
+            sampler = _StackSampler(threading.get_ident(), label, self.interval, self.stacks, self._lock)
+            tracing = self.trace_memory and tracemalloc.is_tracing()
+            if tracing:
+                # Peaks are process-wide, so concurrent requests share a window
+                self._memory_lock.acquire()
+                tracemalloc.reset_peak()
+            started = time.perf_counter()
+            sampler.start()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                sampler.stopped.set()
+                sampler.join()
+                entry = {"stage": label, "seconds": round(time.perf_counter() - started, 4)}
+                if tracing:
+                    try:
+                        # Tracing may have been switched off while this stage ran
+                        if tracemalloc.is_tracing():
+                            peak = tracemalloc.get_traced_memory()[1]
+                            entry["peak_traced_bytes"] = peak
+                            metrics.observe(f"profiling.{label}_peak_bytes", peak)
+                            self._record_allocations(tracemalloc.take_snapshot())
+                    finally:
+                        self._memory_lock.release()
+                self.peaks.append(entry)
+        return profiled
+
+    def _record_allocations(self, snapshot, limit=30):
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        stats = snapshot.statistics('traceback')[:limit]
+        with self._lock:
+            self.allocations = [
+                {
+                    "size_bytes": stat.size,
+                    "count": stat.count,
+                    "traceback": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+                }
+                for stat in stats
+            ]
+
+    def collapsed_stacks(self):
+        """Collapsed-stack text: one 'frame;frame;frame count' line per stack"""
+        with self._lock:
+            return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def allocation_report(self):
+        """Top allocation sites from the most recent traced request"""
+        with self._lock:
+            allocations = list(self.allocations)
+        lines = [f"Top {len(allocations)} allocation sites (most recent profiled stage)", ""]
+        for stat in allocations:
+            lines.append(f"{stat['size_bytes'] / 1024:10.1f} KiB in {stat['count']} blocks")
+            lines.extend(f"    {frame}" for frame in stat["traceback"][-5:])
+        return "\n".join(lines) + "\n"
+
+
+request_profiler = RequestProfiler()
+
+
+def is_admin(request):
+    """Admin endpoints require ADMIN_TOKEN to be configured and sent as X-Admin-Token"""
+    supplied = request.headers.get('x-admin-token') or ''
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode())
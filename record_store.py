@@ -0,0 +1,135 @@
+"""
+Record stores for Aadhaar lookups.
+
+FirestoreRecordStore wraps the real `mock_aadhaar_users` collection.
+InMemoryRecordStore mimics the equality-query semantics fetch_firebase_data
+relies on and can inject latency, errors and timeouts, so the verification
+path can be exercised and load-tested offline and reproducibly.
+"""
+import json
+import math
+import random
+import threading
+import time
+
+DEFAULT_COLLECTION = 'mock_aadhaar_users'
+
+
+class RecordStoreError(Exception):
+    """A lookup failed (backend unavailable, injected fault...)"""
+
+
+class RecordStoreTimeout(RecordStoreError):
+    """A lookup exceeded its deadline"""
+
+
+class FirestoreRecordStore:
+    """Equality lookups against a Firestore collection"""
+
+    def __init__(self, db, collection=DEFAULT_COLLECTION, timeout=None):
+        self.db = db
+        self.collection = collection
+        # Per-call deadline; without it an abandoned (hedged or timed-out) call keeps its thread
+        self.timeout = timeout
+
+    def find_one(self, field, value):
+        """Return the first document where `field == value`, or None"""
+        query = self.db.collection(self.collection).where(field, '==', value).limit(1)
+        # No client-side retries: ResilientRecordStore hedges within its own deadline
+        results = query.get(retry=None, timeout=self.timeout)
+        for doc in results:
+            return doc.to_dict()
+        return None
+
+
+def _index_key(value):
+    """
+    Firestore equality semantics: numbers compare by value across int/float,
+    but never equal strings or booleans of the same spelling.
+    """
+    if isinstance(value, bool):
+        return ('bool', value)
+    if isinstance(value, (int, float)):
+        return ('number', float(value))
+    return (type(value).__name__, value)
+
+
+def parse_latency(spec):
+    """
+    Parse a latency distribution spec (seconds) into a sampler taking an RNG:
+      fixed:0.02 | uniform:0.01,0.05 | exponential:0.02 | lognormal:0.02,0.5 (median, sigma)
+    """
+    if not spec:
+        return lambda rng: 0.0
+    kind, _, params = spec.partition(':')
+    values = [float(p) for p in params.split(',') if p.strip()]
+    kind = kind.strip().lower()
+    if kind == 'fixed':
+        return lambda rng: values[0]
+    if kind == 'uniform':
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'exponential':
+        return lambda rng: rng.expovariate(1.0 / values[0])
+    if kind == 'lognormal':
+        median, sigma = values[0], values[1]
+        return lambda rng: rng.lognormvariate(math.log(median), sigma)
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class InMemoryRecordStore:
+    """In-process stand-in for the Firestore collection with fault injection"""
+
+    def __init__(self, records=(), latency=None, error_rate=0.0, timeout=None, seed=None,
+                 indexed_fields=('aadhaar_hash', 'aadhaar_number')):
+        self.indexed_fields = tuple(indexed_fields)
+        self._indexes = {field: {} for field in self.indexed_fields}
+        self._records = []
+        self._sample_latency = parse_latency(latency) if isinstance(latency, str) or latency is None else latency
+        self.error_rate = error_rate
+        self.timeout = timeout
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        for record in records:
+            self.add(record)
+
+    @classmethod
+    def from_jsonl(cls, path, **kwargs):
+        """Load records from a JSON-lines file (one document per line)"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls((json.loads(line) for line in f if line.strip()), **kwargs)
+
+    def __len__(self):
+        return len(self._records)
+
+    @property
+    def records(self):
+        return self._records
+
+    def add(self, record):
+        self._records.append(record)
+        for field in self.indexed_fields:
+            if field in record:
+                self._indexes[field].setdefault(_index_key(record[field]), record)
+
+    def _simulate_backend(self):
+        with self._rng_lock:
+            delay = max(0.0, self._sample_latency(self._rng))
+            fail = self._rng.random() < self.error_rate
+        if self.timeout is not None and delay > self.timeout:
+            time.sleep(self.timeout)
+            raise RecordStoreTimeout(f"Lookup exceeded {self.timeout:.3f}s")
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise RecordStoreError("Injected backend error (UNAVAILABLE)")
+
+    def find_one(self, field, value):
+        """Return the first record where `field == value`, or None"""
+        self._simulate_backend()
+        index = self._indexes.get(field)
+        if index is not None:
+            record = index.get(_index_key(value))
+        else:
+            key = _index_key(value)
+            record = next((r for r in self._records if field in r and _index_key(r[field]) == key), None)
+        return dict(record) if record is not None else None
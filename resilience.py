@@ -0,0 +1,186 @@
+"""
+Resilient record lookups: per-attempt deadlines, a hedged second attempt
+after a p95-based delay, and a circuit breaker that fails fast while the
+backend is unhealthy.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import metrics
+from record_store import RecordStoreError, RecordStoreTimeout
+
+LOOKUP_ATTEMPT_TIMEOUT = float(os.getenv('LOOKUP_ATTEMPT_TIMEOUT', '2.0'))
+LOOKUP_HEDGING = os.getenv('LOOKUP_HEDGING', 'on').lower() not in ('0', 'off', 'false')
+LOOKUP_HEDGE_PERCENTILE = float(os.getenv('LOOKUP_HEDGE_PERCENTILE', '0.95'))
+LOOKUP_HEDGE_DEFAULT_DELAY = float(os.getenv('LOOKUP_HEDGE_DEFAULT_DELAY', '0.25'))
+LOOKUP_HEDGE_MIN_DELAY = float(os.getenv('LOOKUP_HEDGE_MIN_DELAY', '0.02'))
+LOOKUP_MAX_WORKERS = int(os.getenv('LOOKUP_MAX_WORKERS', '16'))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '5'))
+BREAKER_RESET_SECONDS = float(os.getenv('BREAKER_RESET_SECONDS', '30'))
+
+
+class CircuitOpen(RecordStoreError):
+    """The circuit breaker is open; the lookup was not attempted"""
+
+
+class LatencyTracker:
+    """Rolling window of successful lookup latencies"""
+
+    def __init__(self, window=200, min_samples=20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction):
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half_open after `reset_seconds`, letting one trial lookup through;
+    half_open -> closed on success, back to open on failure.
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        metrics.set_gauge("record_store.breaker_state", self.state)
+
+    def _set_state(self, state):
+        if state != self.state:
+            print(f"⚡ Record store circuit breaker: {self.state} -> {state}", flush=True)
+            metrics.inc(f"record_store.breaker_{state}")
+        self.state = state
+        metrics.set_gauge("record_store.breaker_state", state)
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_seconds:
+                    return False
+                self._set_state("half_open")
+            if self.state == "half_open":
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial_in_flight = False
+            self._set_state("closed")
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state("open")
+
+    def snapshot(self):
+        with self._lock:
+            retry_in = None
+            if self.state == "open":
+                retry_in = max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+            return {"state": self.state, "consecutive_failures": self.failures, "retry_in_seconds": retry_in}
+
+
+class ResilientRecordStore:
+    """Wraps a record store's find_one with deadlines, hedging and a circuit breaker"""
+
+    def __init__(self, store, attempt_timeout=LOOKUP_ATTEMPT_TIMEOUT, hedging=LOOKUP_HEDGING,
+                 breaker=None, max_workers=LOOKUP_MAX_WORKERS):
+        self.store = store
+        self.attempt_timeout = attempt_timeout
+        self.hedging = hedging
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies = LatencyTracker()
+        # Abandoned (timed-out) attempts keep running here until the store's own call
+        # timeout ends them (give stores a timeout <= attempt_timeout); the pool bounds them
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="record-lookup")
+
+    def hedge_delay(self):
+        """Delay before the hedged attempt: recent p95 latency, within sane bounds"""
+        delay = self.latencies.percentile(LOOKUP_HEDGE_PERCENTILE)
+        if delay is None:
+            delay = LOOKUP_HEDGE_DEFAULT_DELAY
+        return min(max(delay, LOOKUP_HEDGE_MIN_DELAY), self.attempt_timeout * 0.9)
+
+    def _timed_find(self, field, value):
+        started = time.perf_counter()
+        result = self.store.find_one(field, value)
+        elapsed = time.perf_counter() - started
+        self.latencies.record(elapsed)
+        metrics.observe("record_store.attempt_seconds", elapsed)
+        return result
+
+    def _hedged_find(self, field, value):
+        attempts = {}
+
+        def launch():
+            future = self.executor.submit(self._timed_find, field, value)
+            attempts[future] = time.monotonic() + self.attempt_timeout
+
+        launch()
+        hedge_at = time.monotonic() + self.hedge_delay()
+        hedged = not self.hedging
+        last_error = None
+
+        while attempts:
+            now = time.monotonic()
+            for future, deadline in list(attempts.items()):
+                if deadline <= now and not future.done():
+                    del attempts[future]
+                    metrics.inc("record_store.attempt_timeouts")
+                    last_error = RecordStoreTimeout(f"Lookup attempt exceeded {self.attempt_timeout:.2f}s")
+
+            if attempts:
+                wake = min(attempts.values())
+                if not hedged:
+                    wake = min(wake, hedge_at)
+                done, _ = wait(list(attempts), timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+                for future in done:
+                    del attempts[future]
+                    error = future.exception()
+                    if error is None:
+                        return future.result()
+                    last_error = error
+
+            # Hedge once: when the first attempt is slower than p95, or it already failed
+            if not hedged and (not attempts or time.monotonic() >= hedge_at):
+                hedged = True
+                metrics.inc("record_store.hedged_attempts")
+                launch()
+
+        raise last_error or RecordStoreTimeout("Lookup failed")
+
+    def find_one(self, field, value):
+        if not self.breaker.allow():
+            metrics.inc("record_store.short_circuited")
+            raise CircuitOpen("Record store circuit breaker is open")
+        try:
+            result = self._hedged_find(field, value)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
@@ -0,0 +1,246 @@
+"""
+Generate synthetic Aadhaar records for load testing, deterministically from a seed.
+
+Records carry every field process_verification reads, with Verhoeff-valid,
+unique Aadhaar numbers. They are either written to Firestore with parallel,
+rate-limited batched commits, or to a JSON-lines file for RECORD_STORE_PATH.
+
+Examples:
+    python seed_records.py --count 1000000 --output seed.jsonl
+    python seed_records.py --count 2000000 --firestore --workers 8 --rate 5000
+    python seed_records.py --count 500000 --start 1500000 --firestore   # resume
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+
+from admission import TokenBucket
+from record_store import DEFAULT_COLLECTION
+
+FIRESTORE_MAX_BATCH = 500
+
+# ---------------- VERHOEFF ----------------
+
+_VERHOEFF_D = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9), (1, 2, 3, 4, 0, 6, 7, 8, 9, 5),
+    (2, 3, 4, 0, 1, 7, 8, 9, 5, 6), (3, 4, 0, 1, 2, 8, 9, 5, 6, 7),
+    (4, 0, 1, 2, 3, 9, 5, 6, 7, 8), (5, 9, 8, 7, 6, 0, 4, 3, 2, 1),
+    (6, 5, 9, 8, 7, 1, 0, 4, 3, 2), (7, 6, 5, 9, 8, 2, 1, 0, 4, 3),
+    (8, 7, 6, 5, 9, 3, 2, 1, 0, 4), (9, 8, 7, 6, 5, 4, 3, 2, 1, 0),
+)
+_VERHOEFF_P = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9), (1, 5, 7, 6, 2, 8, 3, 0, 9, 4),
+    (5, 8, 0, 3, 7, 9, 6, 1, 4, 2), (8, 9, 1, 6, 0, 4, 3, 5, 2, 7),
+    (9, 4, 5, 3, 1, 2, 8, 7, 6, 0), (4, 2, 8, 6, 5, 7, 3, 9, 0, 1),
+    (2, 7, 9, 3, 8, 0, 6, 4, 1, 5), (7, 0, 4, 6, 9, 1, 3, 2, 5, 8),
+)
+_VERHOEFF_INV = (0, 4, 3, 2, 1, 5, 6, 7, 8, 9)
+
+
+def verhoeff_check_digit(digits):
+    """Check digit to append to a string of digits"""
+    c = 0
+    for i, digit in enumerate(reversed(digits)):
+        c = _VERHOEFF_D[c][_VERHOEFF_P[(i + 1) % 8][int(digit)]]
+    return str(_VERHOEFF_INV[c])
+
+
+def verhoeff_valid(number):
+    """True when a digit string (e.g. a 12-digit Aadhaar number) passes the Verhoeff check"""
+    c = 0
+    for i, digit in enumerate(reversed(number)):
+        c = _VERHOEFF_D[c][_VERHOEFF_P[i % 8][int(digit)]]
+    return c == 0
+
+
+# ---------------- RECORDS ----------------
+
+MALE_NAMES = (
+    "Aarav", "Aditya", "Akash", "Amit", "Anil", "Arjun", "Atharv", "Deepak", "Ganesh", "Harsh",
+    "Karan", "Mahesh", "Manoj", "Nikhil", "Omkar", "Pranav", "Pruthviraj", "Rahul", "Rajesh", "Rohan",
+    "Sachin", "Sanjay", "Saurabh", "Siddharth", "Suresh", "Tushar", "Varun", "Vikram", "Vinod", "Yash",
+)
+FEMALE_NAMES = (
+    "Aarti", "Aishwarya", "Ananya", "Anjali", "Deepa", "Divya", "Gauri", "Isha", "Kavita", "Komal",
+    "Lakshmi", "Madhuri", "Meera", "Neha", "Pooja", "Priya", "Rani", "Rekha", "Sakshi", "Shalini",
+    "Shruti", "Sneha", "Sonal", "Sunita", "Swati", "Tanvi", "Usha", "Vaishnavi", "Vidya", "Zoya",
+)
+SURNAMES = (
+    "Bhosale", "Chavan", "Deshmukh", "Desai", "Gaikwad", "Gavhane", "Gupta", "Iyer", "Jadhav", "Joshi",
+    "Kadam", "Kulkarni", "Kumar", "Mehta", "Mishra", "Nair", "Patel", "Patil", "Pawar", "Reddy",
+    "Saudagar", "Shah", "Sharma", "Shinde", "Singh", "Verma", "Yadav", "Rao", "Menon", "Banerjee",
+)
+
+# 11-digit Aadhaar bodies run from 20000000000 to 99999999999 (no leading 0 or 1)
+_BODY_BASE = 2 * 10**10
+_BODY_SPACE = 8 * 10**10
+# Odd and not a multiple of 5, so coprime with _BODY_SPACE (2^13 * 5^10): index -> body is a bijection
+_BODY_STRIDE = 7919227151
+
+
+@lru_cache(maxsize=None)
+def _body_offset(seed):
+    return random.Random(seed).randrange(_BODY_SPACE)
+
+
+def aadhaar_for_index(index, seed):
+    """Unique, Verhoeff-valid Aadhaar number for record `index`"""
+    body = str(_BODY_BASE + (index * _BODY_STRIDE + _body_offset(seed)) % _BODY_SPACE)
+    return body + verhoeff_check_digit(body)
+
+
+def generate_chunk(start, count, seed):
+    """
+    Records start..start+count-1. Every record has its own RNG derived from
+    the seed and its index, so output does not depend on batch boundaries,
+    resumed ranges or worker scheduling.
+    """
+    records = []
+    for index in range(start, start + count):
+        rng = random.Random(seed * 10**12 + index)
+        gender = rng.choice(("Male", "Female"))
+        first = rng.choice(MALE_NAMES if gender == "Male" else FEMALE_NAMES)
+        surname = rng.choice(SURNAMES)
+        aadhaar = aadhaar_for_index(index, seed)
+        records.append({
+            "name": f"{first} {rng.choice(MALE_NAMES)} {surname}",
+            "aadhaar_hash": int(aadhaar),
+            "aadhaar_last4": aadhaar[-4:],
+            "dob": f"{rng.randint(1950, 2006)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "gender": gender,
+            "mobile": f"{rng.randint(6, 9)}{rng.randrange(10**9):09d}",
+            "verified": False,
+            "consent": True,
+            "data_type": "MOCK",
+        })
+    return records
+
+
+def generate_records(count, seed=42, start=0, chunk_size=FIRESTORE_MAX_BATCH):
+    """Yield `count` records starting at index `start`"""
+    for chunk_start in range(start, start + count, chunk_size):
+        yield from generate_chunk(chunk_start, min(chunk_size, start + count - chunk_start), seed)
+
+
+# ---------------- WRITERS ----------------
+
+def write_jsonl(path, count, seed, start):
+    started = time.perf_counter()
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in generate_records(count, seed, start):
+            f.write(json.dumps(record, separators=(',', ':')) + "\n")
+            written += 1
+            if written % 100000 == 0:
+                print(f"  {written:,} records", flush=True)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Wrote {written:,} records to {path} in {elapsed:.1f}s ({written / elapsed:,.0f}/s)")
+
+
+class FirestoreSeeder:
+    """Parallel batched commits under a shared documents-per-second budget"""
+
+    def __init__(self, db, collection, batch_size, workers, rate, retries=5):
+        self.db = db
+        self.collection = collection
+        self.batch_size = batch_size
+        self.workers = workers
+        self.retries = retries
+        self.bucket = TokenBucket(rate, max(rate, batch_size)) if rate else None
+        self._lock = threading.Lock()
+        self.written = 0
+
+    def _throttle(self, documents):
+        if self.bucket is None:
+            return
+        while True:
+            with self._lock:
+                allowed, wait_seconds = self.bucket.try_acquire(documents)
+            if allowed:
+                return
+            time.sleep(wait_seconds)
+
+    def _commit_chunk(self, start, count, seed):
+        records = generate_chunk(start, count, seed)
+        self._throttle(len(records))
+        collection = self.db.collection(self.collection)
+        for attempt in range(self.retries):
+            batch = self.db.batch()
+            for offset, record in enumerate(records):
+                # Stable IDs: re-running a range overwrites instead of duplicating
+                batch.set(collection.document(f"seed-{seed}-{start + offset:010d}"), record)
+            try:
+                batch.commit()
+                break
+            except Exception as e:
+                if attempt == self.retries - 1:
+                    raise
+                backoff = min(30.0, 0.5 * 2 ** attempt) * (0.5 + random.random())
+                print(f"⚠️  Batch at {start} failed ({e}); retrying in {backoff:.1f}s", flush=True)
+                time.sleep(backoff)
+        with self._lock:
+            self.written += len(records)
+        return len(records)
+
+    def run(self, count, seed, start):
+        started = time.perf_counter()
+        chunks = ((s, min(self.batch_size, start + count - s)) for s in range(start, start + count, self.batch_size))
+        in_flight = set()
+        reported = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for chunk_start, chunk_count in chunks:
+                # Bound queued chunks so millions of records never sit in memory at once
+                while len(in_flight) >= self.workers * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                in_flight.add(pool.submit(self._commit_chunk, chunk_start, chunk_count, seed))
+                if self.written - reported >= 50000:
+                    reported = self.written
+                    elapsed = time.perf_counter() - started
+                    print(f"  {self.written:,} records ({self.written / elapsed:,.0f}/s)", flush=True)
+            for future in in_flight:
+                future.result()
+        elapsed = time.perf_counter() - started
+        print(f"✅ Committed {self.written:,} records to '{self.collection}' in {elapsed:.1f}s "
+              f"({self.written / elapsed:,.0f}/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed synthetic Aadhaar records")
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--start", type=int, default=0, help="First record index (to resume or extend a run)")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--output", help="Write JSON lines here (for RECORD_STORE_PATH)")
+    target.add_argument("--firestore", action="store_true", help="Commit to Firestore")
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    parser.add_argument("--batch-size", type=int, default=FIRESTORE_MAX_BATCH)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=1000, help="Documents per second (0 = unlimited)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"SEEDING {args.count:,} RECORDS (seed {args.seed}, from index {args.start})")
+    print("=" * 60)
+
+    if args.output:
+        write_jsonl(args.output, args.count, args.seed, args.start)
+        return
+
+    import firebase_utils
+
+    if not firebase_utils.initialize_firebase():
+        sys.exit("❌ Firebase is not configured")
+    batch_size = max(1, min(args.batch_size, FIRESTORE_MAX_BATCH))
+    seeder = FirestoreSeeder(firebase_utils.db, args.collection, batch_size, args.workers, args.rate)
+    seeder.run(args.count, args.seed, args.start)
+
+
+if __name__ == "__main__":
+    main()
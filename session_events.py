@@ -0,0 +1,59 @@
+"""
+Per-session event channels for streaming extraction progress to the browser
+over Server-Sent Events. Events are kept for the life of the session so a
+client that connects late (or reconnects) replays everything it missed.
+"""
+import asyncio
+import json
+
+
+class SessionChannel:
+    """Append-only event log with live fan-out to SSE subscribers"""
+
+    def __init__(self):
+        self.events = []
+        self.closed = False
+        self._subscribers = set()
+
+    def publish(self, event, data):
+        """Record an event and push it to every connected subscriber"""
+        item = (len(self.events), event, data)
+        self.events.append(item)
+        for queue in self._subscribers:
+            queue.put_nowait(item)
+
+    def close(self):
+        """Mark the stream finished; subscribers disconnect after draining"""
+        self.closed = True
+        for queue in self._subscribers:
+            queue.put_nowait(None)
+
+    async def stream(self, last_event_id=None):
+        """Yield SSE-formatted events, replaying history first"""
+        queue = asyncio.Queue()
+        self._subscribers.add(queue)
+        try:
+            start = 0 if last_event_id is None else last_event_id + 1
+            replay, seen, closed = self.events[start:], len(self.events), self.closed
+            for item in replay:
+                yield format_sse(*item)
+            if closed:
+                return
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Keep proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    return
+                if item[0] < seen:
+                    continue
+                yield format_sse(*item)
+        finally:
+            self._subscribers.discard(queue)
+
+
+def format_sse(event_id, event, data):
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -0,0 +1,113 @@
+"""
+Stateless session tokens for horizontally scaled deployments.
+
+The processing result is carried in the OTP form as a compressed, encrypted
+and HMAC-signed token (Fernet: AES-CBC + HMAC-SHA256 with an embedded
+timestamp), so /verify-otp can be served by any worker on any node that shares
+SESSION_TOKEN_SECRET. Tokens expire after SESSION_TOKEN_TTL seconds, are bound
+to the client that uploaded the documents, and carry a one-time ID that each
+worker process refuses to accept twice. Used IDs are not shared between
+processes, so within the TTL a token can still be redeemed once per worker
+(on every node); the short default TTL bounds that window.
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+
+SESSION_TOKENS_ENABLED = os.getenv('SESSION_TOKENS', 'off').lower() in ('1', 'on', 'true')
+SESSION_TOKEN_SECRET = os.getenv('SESSION_TOKEN_SECRET')
+SESSION_TOKEN_TTL = int(os.getenv('SESSION_TOKEN_TTL', '300'))
+
+if SESSION_TOKENS_ENABLED and not SESSION_TOKEN_SECRET:
+    print("⚠️  SESSION_TOKENS is on but SESSION_TOKEN_SECRET is not set.")
+    print("   → Stateless sessions disabled; falling back to in-process sessions")
+    SESSION_TOKENS_ENABLED = False
+
+
+class InvalidSessionToken(Exception):
+    """Raised for tokens that are malformed, tampered with, expired or replayed"""
+
+
+def _fernet(secret):
+    from cryptography.fernet import Fernet
+
+    key = base64.urlsafe_b64encode(hashlib.sha256(secret.encode()).digest())
+    return Fernet(key)
+
+
+def _client_fingerprint(client_key):
+    return hashlib.sha256(client_key.encode()).hexdigest()[:16]
+
+
+class _UsedTokens:
+    """Bounded set of token IDs already redeemed in this process"""
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, jti, expires_at):
+        """Record a token ID. Returns False if it was already redeemed"""
+        now = time.time()
+        with self._lock:
+            while self._entries:
+                oldest, expiry = next(iter(self._entries.items()))
+                if expiry > now and len(self._entries) < self.max_entries:
+                    break
+                self._entries.popitem(last=False)
+            if jti in self._entries:
+                return False
+            self._entries[jti] = expires_at
+            return True
+
+
+_used_tokens = _UsedTokens()
+
+
+def issue_session_token(session_data, client_key, secret=None, ttl=SESSION_TOKEN_TTL):
+    """Seal a session's results into a token for the OTP form"""
+    payload = {
+        "jti": uuid.uuid4().hex,
+        "exp": int(time.time()) + ttl,
+        "client": _client_fingerprint(client_key),
+        "data": session_data,
+    }
+    compressed = zlib.compress(json.dumps(payload, default=str, separators=(',', ':')).encode(), 9)
+    return _fernet(secret or SESSION_TOKEN_SECRET).encrypt(compressed).decode()
+
+
+def _open_session_token(token, client_key, secret, ttl):
+    """Verify and decrypt a token without consuming it. Returns the payload"""
+    from cryptography.fernet import InvalidToken
+
+    try:
+        compressed = _fernet(secret or SESSION_TOKEN_SECRET).decrypt(token.encode(), ttl=ttl)
+        payload = json.loads(zlib.decompress(compressed))
+    except (InvalidToken, zlib.error, ValueError) as e:
+        raise InvalidSessionToken("Session expired. Please try again.") from e
+
+    if payload.get("exp", 0) < time.time():
+        raise InvalidSessionToken("Session expired. Please try again.")
+    if payload.get("client") != _client_fingerprint(client_key):
+        raise InvalidSessionToken("Session does not belong to this client. Please try again.")
+    return payload
+
+
+def peek_session_token(token, client_key, secret=None, ttl=SESSION_TOKEN_TTL):
+    """Verify and decrypt a token without consuming it (to re-render the OTP form)"""
+    return _open_session_token(token, client_key, secret, ttl)["data"]
+
+
+def redeem_session_token(token, client_key, secret=None, ttl=SESSION_TOKEN_TTL):
+    """Verify, decrypt and consume a token. Returns the session data"""
+    payload = _open_session_token(token, client_key, secret, ttl)
+    if not _used_tokens.claim(payload["jti"], payload["exp"]):
+        raise InvalidSessionToken("This verification session has already been used.")
+    return payload["data"]
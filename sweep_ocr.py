@@ -0,0 +1,199 @@
+"""
+Accuracy-vs-latency sweep over preprocessing and OCR settings.
+
+Runs read_pan/read_aadhaar (and so extract_pan_details/extract_aadhaar_details)
+over a labeled corpus (see ocr_corpus.py) for every configuration in a grid,
+scores field accuracy against the labels, times every image, and reports
+the Pareto frontier: configurations no other one beats on both accuracy and
+mean latency.
+
+Grid keys:
+    contrast            greyscale gain in preprocess_image
+    adaptive_levels     coarse-to-fine long edges, e.g. "960" or "640,960" ("" = full resolution only)
+    recheck_confidence  confidence below which weak boxes are re-read
+    <option>            OCR profile option for every document (decoder, canvas_size, mag_ratio...)
+    <document>.<option> OCR profile option for one document (pan.decoder, aadhaar.canvas_size...)
+
+Examples:
+    python sweep_ocr.py --labels corpus/labels.jsonl
+    python sweep_ocr.py --labels corpus/labels.jsonl --out sweep.json \\
+        --grid '{"contrast": [1.0, 1.3], "adaptive_levels": ["", "960"], "canvas_size": [1280, 1600]}'
+"""
+import argparse
+import copy
+import itertools
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from PIL import Image
+
+import ocr_profiles
+import ocr_utils
+
+DEFAULT_GRID = {
+    "contrast": [1.0, 1.3, 1.6],
+    "adaptive_levels": ["", "960"],
+    "decoder": ["greedy", "beamsearch"],
+}
+
+READERS = {"pan": ocr_utils.read_pan, "aadhaar": ocr_utils.read_aadhaar}
+
+
+def load_corpus(labels_path, limit=None):
+    """Labeled entries with their images decoded up front (decode time is not OCR time)"""
+    base = os.path.dirname(os.path.abspath(labels_path))
+    corpus = []
+    with open(labels_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            with Image.open(os.path.join(base, entry["image"])) as img:
+                entry["pil"] = img.convert("RGB")
+            corpus.append(entry)
+            if limit and len(corpus) >= limit:
+                break
+    return corpus
+
+
+def expand_grid(grid):
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+@contextmanager
+def applied(config):
+    """Apply a configuration to the OCR modules for the duration of a run"""
+    saved = (ocr_utils.OCR_CONTRAST, ocr_utils.OCR_ADAPTIVE, ocr_utils.OCR_ADAPTIVE_LEVELS,
+             ocr_utils.OCR_RECHECK_CONFIDENCE, ocr_profiles.profiles)
+    profiles = copy.deepcopy(ocr_profiles.profiles)
+    try:
+        for key, value in config.items():
+            if key == "contrast":
+                ocr_utils.OCR_CONTRAST = float(value)
+            elif key == "adaptive_levels":
+                levels = sorted(int(edge) for edge in str(value).split(",") if edge.strip())
+                ocr_utils.OCR_ADAPTIVE, ocr_utils.OCR_ADAPTIVE_LEVELS = bool(levels), levels
+            elif key == "recheck_confidence":
+                ocr_utils.OCR_RECHECK_CONFIDENCE = float(value)
+            else:
+                document, _, option = key.rpartition(".")
+                profiles.setdefault(document or "default", {"fields": {}})[option] = value
+        ocr_profiles.profiles = ocr_profiles.validate_profiles(profiles)
+        yield
+    finally:
+        (ocr_utils.OCR_CONTRAST, ocr_utils.OCR_ADAPTIVE, ocr_utils.OCR_ADAPTIVE_LEVELS,
+         ocr_utils.OCR_RECHECK_CONFIDENCE, ocr_profiles.profiles) = saved
+
+
+def normalize(value):
+    return " ".join(str(value).upper().split()) if value is not None else None
+
+
+def score(expected, details):
+    """Per-field exact match after case/whitespace normalization"""
+    return {field: normalize(details.get(field)) == normalize(value) for field, value in expected.items()}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def run_config(config, corpus):
+    fields, augmentations, latencies = {}, {}, []
+    with applied(config):
+        for entry in corpus:
+            started = time.perf_counter()
+            details = READERS[entry["document"]](entry["pil"])
+            latencies.append(time.perf_counter() - started)
+            for field, ok in score(entry["expected"], details).items():
+                for bucket, key in ((fields, f"{entry['document']}.{field}"),
+                                    (augmentations, entry.get("augmentation", "clean"))):
+                    hits, total = bucket.get(key, (0, 0))
+                    bucket[key] = (hits + ok, total + 1)
+
+    hits = sum(h for h, _ in fields.values())
+    total = sum(t for _, t in fields.values())
+    latencies.sort()
+    return {
+        "config": config,
+        "accuracy": hits / total if total else 0.0,
+        "mean_seconds": sum(latencies) / len(latencies) if latencies else 0.0,
+        "p50_seconds": percentile(latencies, 0.5),
+        "p95_seconds": percentile(latencies, 0.95),
+        "fields": {key: h / t for key, (h, t) in sorted(fields.items())},
+        "augmentations": {key: h / t for key, (h, t) in sorted(augmentations.items())},
+    }
+
+
+def pareto_frontier(results):
+    """Results not dominated on (higher accuracy, lower mean latency), fastest first"""
+    frontier, best_accuracy = [], -1.0
+    for result in sorted(results, key=lambda r: (r["mean_seconds"], -r["accuracy"])):
+        if result["accuracy"] > best_accuracy:
+            frontier.append(result)
+            best_accuracy = result["accuracy"]
+    return frontier
+
+
+def _describe(config):
+    return ", ".join(f"{key}={value!r}" for key, value in config.items()) or "(defaults)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep OCR settings for accuracy vs latency")
+    parser.add_argument("--labels", default="corpus/labels.jsonl")
+    parser.add_argument("--grid", help="JSON object (or path to a JSON file) of key -> list of values")
+    parser.add_argument("--limit", type=int, help="Use only the first N labeled images")
+    parser.add_argument("--out", help="Write all results as JSON here")
+    args = parser.parse_args()
+
+    grid = DEFAULT_GRID
+    if args.grid:
+        if os.path.exists(args.grid):
+            with open(args.grid, "r", encoding="utf-8") as f:
+                grid = json.load(f)
+        else:
+            grid = json.loads(args.grid)
+
+    corpus = load_corpus(args.labels, args.limit)
+    configs = expand_grid(grid)
+    print("=" * 70)
+    print(f"OCR SWEEP: {len(configs)} configurations x {len(corpus)} images")
+    print("=" * 70)
+
+    # Load models outside the timed runs
+    READERS[corpus[0]["document"]](corpus[0]["pil"])
+
+    results = []
+    for number, config in enumerate(configs, 1):
+        result = run_config(config, corpus)
+        results.append(result)
+        print(f"[{number}/{len(configs)}] acc {result['accuracy']:6.1%}  "
+              f"mean {result['mean_seconds'] * 1000:7.0f} ms  p95 {result['p95_seconds'] * 1000:7.0f} ms  "
+              f"{_describe(config)}", flush=True)
+
+    frontier = pareto_frontier(results)
+    print("\nPareto frontier (fastest first):")
+    for result in frontier:
+        print(f"  acc {result['accuracy']:6.1%}  mean {result['mean_seconds'] * 1000:7.0f} ms  {_describe(result['config'])}")
+    best = frontier[-1]
+    print("\nMost accurate frontier point, per field:")
+    for field, accuracy in best["fields"].items():
+        print(f"  {accuracy:6.1%}  {field}")
+    print("Per augmentation:")
+    for augmentation, accuracy in best["augmentations"].items():
+        print(f"  {accuracy:6.1%}  {augmentation}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"grid": grid, "results": results, "frontier": [r["config"] for r in frontier]}, f, indent=2)
+        print(f"\n✅ Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import random
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import orientation
+from ocr_corpus import render_aadhaar, render_pan
+from seed_records import generate_records
+
+RECORDS = list(generate_records(8, seed=11))
+TRANSPOSE = {90: Image.ROTATE_90, 180: Image.ROTATE_180, 270: Image.ROTATE_270}
+
+
+def _card(render, index, rotation=0):
+    img, _ = render(RECORDS[index], random.Random(index))
+    return img.transpose(TRANSPOSE[rotation]) if rotation else img
+
+
+def _grey(img):
+    return np.array(img.convert("L"))
+
+
+def _found(crop, reference):
+    """Whether `crop` appears in `reference` pixel for pixel"""
+    height, width = crop.shape
+    middle = crop[height // 2].tobytes()
+    for y in range(height // 2, reference.shape[0] - (height - height // 2) + 1):
+        x = reference[y].tobytes().find(middle)
+        top = y - height // 2
+        if x >= 0 and np.array_equal(reference[top:top + height, x:x + width], crop):
+            return True
+    return False
+
+
+def _reference_recognize(reference):
+    """A recognizer that is confident only on crops that read as they do on the upright card"""
+    def recognize(crop):
+        if _found(crop, reference):
+            return [(None, "text", 0.9)]
+        if _found(crop[::-1, ::-1], reference):
+            return [(None, "txet", 0.2)]
+        return [(None, "", 0.5)]
+    return recognize
+
+
+@pytest.mark.parametrize("mode", ["confidence", "baseline"])
+@pytest.mark.parametrize("render", [render_aadhaar, render_pan])
+def test_upright_cards_are_not_turned(monkeypatch, mode, render):
+    monkeypatch.setattr(orientation, "ORIENTATION_FLIP", mode)
+    angles = [orientation.estimate_rotation(_card(render, index)) for index in range(len(RECORDS))]
+    assert angles == [0] * len(RECORDS)
+
+
+@pytest.mark.parametrize("render", [render_aadhaar, render_pan])
+def test_geometry_leaves_up_down_to_the_line_check(render):
+    angles = [orientation.estimate_rotation(_card(render, index, 180)) for index in range(len(RECORDS))]
+    assert angles == [0] * len(RECORDS)
+    for rotation in (90, 270):
+        angles = [orientation.estimate_rotation(_card(render, index, rotation)) for index in range(len(RECORDS))]
+        assert angles == [90] * len(RECORDS)
+
+
+@pytest.mark.parametrize("rotation", [0, 90, 180, 270])
+@pytest.mark.parametrize("render", [render_aadhaar, render_pan])
+def test_every_rotation_ends_upright(render, rotation):
+    for index in range(len(RECORDS)):
+        reference = _grey(_card(render, index))
+        img, _ = orientation.auto_orient(_card(render, index, rotation))
+        grey, turned = orientation.orient_upright(_grey(img), _reference_recognize(reference))
+        assert turned == (rotation in (90, 180))
+        assert np.array_equal(grey, reference)
+
+
+def test_line_check_can_be_switched_off(monkeypatch):
+    monkeypatch.setattr(orientation, "ORIENTATION_FLIP", "off")
+    reference = _grey(_card(render_pan, 0))
+    grey, turned = orientation.orient_upright(reference[::-1, ::-1], _reference_recognize(reference))
+    assert not turned
+
+
+def test_flat_image_is_not_turned():
+    flat = Image.new("L", (640, 400), 200)
+    assert orientation.estimate_rotation(flat) == 0
+    assert orientation.line_crops(np.asarray(flat)) == []
+
+
+def _striped_page():
+    """Three wide text-like lines whose ink sits in the top half when upright"""
+    image = np.full((300, 600), 255, np.uint8)
+    for top in (20, 120, 220):
+        image[top:top + 15, 40:560] = 0
+        image[top + 15:top + 30, 40:560:12] = 0
+    return image
+
+
+def _fake_recognize(crop):
+    # Confident only when the ink is in the top half, like a reader on upright text
+    half = crop.shape[0] // 2
+    confidence = 0.9 if crop[:half].mean() < crop[half:].mean() else 0.2
+    return [(None, "text", confidence)]
+
+
+def test_confidence_check_detects_upside_down_lines():
+    page = _striped_page()
+    assert len(orientation.line_crops(page)) == 3
+    assert not orientation.upside_down(orientation.line_crops(page), _fake_recognize)
+    assert orientation.upside_down(orientation.line_crops(page[::-1, ::-1]), _fake_recognize)
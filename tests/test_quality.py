@@ -0,0 +1,60 @@
+import random
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter
+
+from ocr_corpus import render_aadhaar, render_pan
+from quality import check_quality
+from seed_records import generate_records
+
+RECORDS = list(generate_records(6, seed=7))
+
+
+def _card(render, index):
+    img, _ = render(RECORDS[index], random.Random(index))
+    return img
+
+
+@pytest.mark.parametrize("index", range(len(RECORDS)))
+@pytest.mark.parametrize("render", [render_aadhaar, render_pan])
+def test_clean_cards_pass(render, index):
+    ok, message, scores = check_quality(_card(render, index))
+    assert ok, (message, scores)
+
+
+def test_white_card_on_white_scan_passes():
+    # e-Aadhaar printout on a flatbed: near-255 paper around and behind the card
+    scan = Image.new("RGB", (1700, 1100), (255, 255, 255))
+    scan.paste(_card(render_aadhaar, 0), (210, 146))
+    ok, message, scores = check_quality(scan)
+    assert ok, (message, scores)
+    assert scores["glare"] == 0.0
+
+
+def test_glare_spot_is_rejected():
+    card = _card(render_pan, 0)
+    ImageDraw.Draw(card).ellipse([300, 150, 900, 650], fill=(255, 255, 255))
+    ok, _, scores = check_quality(card)
+    assert not ok
+    assert scores["reason"] == "glare"
+
+
+def test_washed_out_photo_is_rejected():
+    arr = np.asarray(_card(render_aadhaar, 1), dtype=np.float32)
+    washed = Image.fromarray((255 - (255 - arr) * 0.15).astype(np.uint8))
+    ok, _, scores = check_quality(washed)
+    assert not ok
+    assert scores["reason"] == "overexposed"
+
+
+def test_dark_photo_is_rejected():
+    ok, _, scores = check_quality(ImageEnhance.Brightness(_card(render_aadhaar, 2)).enhance(0.15))
+    assert not ok
+    assert scores["reason"] == "dark"
+
+
+def test_blurred_photo_is_rejected():
+    ok, _, scores = check_quality(_card(render_pan, 3).filter(ImageFilter.GaussianBlur(4)))
+    assert not ok
+    assert scores["reason"] == "blur"
@@ -0,0 +1,137 @@
+import threading
+import time
+
+import pytest
+
+from record_store import FirestoreRecordStore, InMemoryRecordStore, RecordStoreError
+from resilience import CircuitBreaker, CircuitOpen, ResilientRecordStore
+
+RECORD = {"name": "ASHA VERMA", "aadhaar_hash": 234567890123, "dob": "1990-01-01"}
+
+
+class FakeQuery:
+    """Just enough of a Firestore query for FirestoreRecordStore"""
+
+    def __init__(self, db, field, value):
+        self.db, self.field, self.value = db, field, value
+
+    def limit(self, count):
+        return self
+
+    def get(self, retry="default", timeout=None):
+        self.db.calls.append({"retry": retry, "timeout": timeout})
+        if self.db.delay:
+            time.sleep(self.db.delay)
+        if self.db.error:
+            raise self.db.error
+        return [FakeSnapshot(doc) for doc in self.db.docs if doc.get(self.field) == self.value]
+
+
+class FakeSnapshot:
+    def __init__(self, doc):
+        self._doc = doc
+
+    def to_dict(self):
+        return dict(self._doc)
+
+
+class FakeDb:
+    def __init__(self, docs=(), delay=0.0, error=None):
+        self.docs, self.delay, self.error = list(docs), delay, error
+        self.calls = []
+
+    def collection(self, name):
+        return self
+
+    def where(self, field, op, value):
+        return FakeQuery(self, field, value)
+
+
+def test_firestore_store_passes_timeout_and_disables_retries():
+    db = FakeDb([RECORD])
+    store = ResilientRecordStore(FirestoreRecordStore(db, timeout=1.5))
+    assert store.find_one("aadhaar_hash", 234567890123)["name"] == "ASHA VERMA"
+    assert db.calls[0] == {"retry": None, "timeout": 1.5}
+
+
+def test_wrapped_stores_are_truthy():
+    # Callers test `store is None`, but a wrapped store must never look "missing"
+    assert ResilientRecordStore(FirestoreRecordStore(FakeDb()))
+    assert ResilientRecordStore(InMemoryRecordStore([]))
+
+
+def test_breaker_opens_after_consecutive_failures():
+    store = ResilientRecordStore(
+        FirestoreRecordStore(FakeDb(error=RuntimeError("UNAVAILABLE"))),
+        hedging=False, breaker=CircuitBreaker(failure_threshold=2, reset_seconds=60)
+    )
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            store.find_one("aadhaar_hash", 1)
+    with pytest.raises(CircuitOpen):
+        store.find_one("aadhaar_hash", 1)
+
+
+def test_hung_attempt_times_out():
+    store = ResilientRecordStore(FirestoreRecordStore(FakeDb(delay=1.0)), attempt_timeout=0.1, hedging=False)
+    started = time.monotonic()
+    with pytest.raises(RecordStoreError):
+        store.find_one("aadhaar_hash", 1)
+    assert time.monotonic() - started < 0.5
+
+
+class FirstCallSlow(FirestoreRecordStore):
+    def __init__(self, db):
+        super().__init__(db)
+        self._lock = threading.Lock()
+        self.started = 0
+
+    def find_one(self, field, value):
+        with self._lock:
+            self.started += 1
+            first = self.started == 1
+        if first:
+            time.sleep(1.0)
+        return super().find_one(field, value)
+
+
+def test_hedged_attempt_answers_when_the_first_is_slow():
+    inner = FirstCallSlow(FakeDb([RECORD]))
+    store = ResilientRecordStore(inner, attempt_timeout=2.0)
+    started = time.monotonic()
+    assert store.find_one("aadhaar_hash", 234567890123)["name"] == "ASHA VERMA"
+    assert time.monotonic() - started < 0.9
+    assert inner.started == 2
+
+
+def test_process_verification_through_firestore_store():
+    firebase_utils = pytest.importorskip("firebase_utils", exc_type=ImportError)
+    saved = firebase_utils.record_store
+    try:
+        firebase_utils.set_record_store(FirestoreRecordStore(FakeDb([RECORD]), timeout=1.0))
+        ocr_data = {"pan": {"name": "Asha  Verma"}, "aadhaar": {"aadhaar_number": "234567890123"}}
+        result = firebase_utils.process_verification(ocr_data)
+        assert result["verified"] is True
+        assert result["error_code"] is None
+
+        ocr_data["pan"]["name"] = "SOMEONE ELSE"
+        assert firebase_utils.process_verification(ocr_data)["error_code"] == "name_mismatch"
+
+        ocr_data["aadhaar"]["aadhaar_number"] = "999999999999"
+        assert firebase_utils.process_verification(ocr_data)["error_code"] == "not_found"
+    finally:
+        firebase_utils.record_store = saved
+
+
+def test_empty_memory_store_is_not_test_mode():
+    firebase_utils = pytest.importorskip("firebase_utils", exc_type=ImportError)
+    saved = firebase_utils.record_store
+    try:
+        firebase_utils.set_record_store(InMemoryRecordStore([]))
+        result = firebase_utils.process_verification(
+            {"pan": {"name": "ASHA VERMA"}, "aadhaar": {"aadhaar_number": "234567890123"}}
+        )
+        assert result["test_mode"] is False
+        assert result["error_code"] == "not_found"
+    finally:
+        firebase_utils.record_store = saved